@@ -0,0 +1,109 @@
+# async_api.py
+# Endpoints asincronos (modo asincrono) - Getsemani Vivo
+#
+# Cuando DATABASE_URL usa un driver async (ver database.py), main.py registra
+# este router en lugar de las versiones sincronas de los endpoints mas usados:
+# el catalogo publico y los puntos del usuario. Sus consultas esperan a la base
+# de datos sin ocupar un hilo del threadpool durante la consulta.
+#
+# Las rutas, respuestas, cache y cabeceras son las mismas que en main.py.
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import get_async_db
+from auth import get_current_active_user
+import schemas
+import crud_async
+import pagination
+import cache
+import fastjson
+
+router = APIRouter()
+
+
+# =============================================================================
+# ENDPOINTS PUBLICOS DE NEGOCIOS
+# =============================================================================
+
+@router.get("/businesses", response_model=List[schemas.BusinessSimple], tags=["Negocios - Publico"])
+async def list_businesses(
+    request: Request,
+    skip: int = 0,
+    limit: int = 20,
+    category: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    after = pagination.decode_cursor(cursor, pagination.ID_CURSOR)
+
+    async def build():
+        businesses = await crud_async.get_businesses(db, skip=skip, limit=limit, category=category, only_approved=True, after=after)
+        next_cursor = pagination.next_cursor(businesses, limit, pagination.id_key)
+        headers = {pagination.NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        return cache.CachedResponse(fastjson.dump_list(schemas.BusinessSimple, businesses), headers)
+
+    key = ("list", skip if after is None else None, limit, category, after)
+    return await cache.cached_json_async(request, key, build)
+
+
+@router.get("/businesses/featured", response_model=List[schemas.BusinessSimple], tags=["Negocios - Publico"])
+async def list_featured_businesses(request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def build():
+        businesses = await crud_async.get_featured_businesses(db)
+        return cache.CachedResponse(fastjson.dump_list(schemas.BusinessSimple, businesses))
+
+    return await cache.cached_json_async(request, ("featured",), build)
+
+
+@router.get("/businesses/{business_id}", response_model=schemas.Business, tags=["Negocios - Publico"])
+async def get_business(business_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def build():
+        business = await crud_async.get_business(db, business_id)
+        if not business or business.status != "approved":
+            raise HTTPException(status_code=404, detail="Negocio no encontrado")
+        return cache.CachedResponse(fastjson.dump(schemas.Business, business))
+
+    return await cache.cached_json_async(request, ("detail", business_id), build)
+
+
+@router.get("/businesses/{business_id}/images", response_model=List[schemas.BusinessImage], tags=["Negocios - Publico"])
+async def get_business_images_public(business_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def build():
+        business = await crud_async.get_business(db, business_id)
+        if not business or business.status != "approved":
+            raise HTTPException(status_code=404, detail="Negocio no encontrado")
+        # Las imagenes ya vienen cargadas con el negocio
+        images = sorted(business.images, key=lambda image: image.order)
+        return cache.CachedResponse(fastjson.dump_list(schemas.BusinessImage, images))
+
+    return await cache.cached_json_async(request, ("images", business_id), build)
+
+
+# =============================================================================
+# ENDPOINTS DE MIS PUNTOS
+# =============================================================================
+
+@router.get("/my-points", response_model=schemas.UserPointsSummary, tags=["Mis Puntos"])
+async def get_my_points(
+    current_user = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await crud_async.get_user_points_summary(db, current_user.id)
+
+
+@router.get("/my-points/history", response_model=List[schemas.ConsumptionWithDetails], tags=["Mis Puntos"])
+async def get_my_consumption_history(
+    skip: int = 0,
+    limit: int = 50,
+    cursor: Optional[str] = Query(None),
+    current_user = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    after = pagination.decode_cursor(cursor, pagination.CREATED_AT_CURSOR)
+    consumptions = await crud_async.get_user_consumption_history(db, current_user.id, skip=skip, limit=limit, after=after)
+    response = fastjson.list_response(schemas.ConsumptionWithDetails, consumptions)
+    pagination.set_next_cursor(response, consumptions, limit, pagination.created_at_key)
+    return response
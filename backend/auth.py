@@ -4,13 +4,15 @@
 from datetime import datetime, timedelta
 from typing import Optional, List
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
-from database import get_db
+from database import get_db, SessionLocal, ReadSessionLocal, has_recent_write
 import models
+import cache
+import passwords
 
 # =============================================================================
 # CONFIGURACIÓN DE SEGURIDAD
@@ -24,21 +26,22 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 horas
 # CONFIGURACIÓN DE CONTRASEÑAS Y OAUTH2
 # =============================================================================
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 # =============================================================================
 # FUNCIONES DE CONTRASEÑA
 # =============================================================================
 
+# Los hashes se calculan en el pool acotado de passwords.py
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica si una contraseña coincide con su hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return passwords.verify_password(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Convierte una contraseña a hash seguro"""
-    return pwd_context.hash(password)
+    return passwords.hash_password(password)
 
 # =============================================================================
 # FUNCIONES DE TOKEN JWT
@@ -61,18 +64,41 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 # FUNCIONES DE AUTENTICACIÓN
 # =============================================================================
 
-def authenticate_user(db: Session, email: str, password: str):
-    """Verifica las credenciales de un usuario"""
-    user = db.query(models.User).filter(models.User.email == email).first()
+def _get_user_by_email(db: Session, email: str):
+    return db.query(models.User).filter(models.User.email == email).first()
+
+
+async def authenticate_user(db: Session, email: str, password: str):
+    """
+    Verifica las credenciales de un usuario. Es asincrona para no ocupar un
+    hilo del threadpool mientras bcrypt trabaja en el pool de passwords.py:
+    solo la consulta corre en el threadpool.
+    """
+    user = await run_in_threadpool(_get_user_by_email, db, email)
     
     if not user:
         return False
     
-    if not verify_password(password, user.hashed_password):
+    if not await passwords.verify_password_async(password, user.hashed_password):
         return False
     
     return user
 
+# =============================================================================
+# USUARIO AUTENTICADO
+# =============================================================================
+
+class Principal:
+    """
+    Copia de los datos del usuario autenticado, independiente de la sesion de
+    base de datos para poder guardarla en cache.principal_cache.
+    """
+    __slots__ = ("id", "email", "role", "full_name", "phone", "is_active", "created_at")
+    
+    def __init__(self, user: models.User):
+        for field in self.__slots__:
+            setattr(self, field, getattr(user, field))
+
 # =============================================================================
 # DEPENDENCIAS DE SEGURIDAD
 # =============================================================================
@@ -98,12 +124,24 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.email == email).first()
+    # La cache es por proceso: un cambio de rol o una desactivacion hecha en
+    # otro worker se ve aqui cuando vence PRINCIPAL_CACHE_TTL (ver cache.py)
+    principal = cache.principal_cache.get(email)
+    if principal is not None:
+        return principal
+    
+    generation = cache.principal_cache.generation
+    # La consulta corre en el threadpool para no bloquear el event loop
+    user = await run_in_threadpool(
+        lambda: db.query(models.User).filter(models.User.email == email).first()
+    )
     
     if user is None:
         raise credentials_exception
     
-    return user
+    principal = Principal(user)
+    cache.principal_cache.set(email, principal, generation=generation)
+    return principal
 
 
 async def get_current_active_user(current_user = Depends(get_current_user)):
@@ -115,6 +153,19 @@ async def get_current_active_user(current_user = Depends(get_current_user)):
         )
     return current_user
 
+
+def get_user_read_db(current_user = Depends(get_current_active_user)):
+    """
+    Sesion de lectura para endpoints autenticados: de la replica, o de la
+    primaria si el usuario acaba de registrar un consumo (ver database.py).
+    """
+    db = SessionLocal() if has_recent_write(current_user.id) else ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 # =============================================================================
 # VERIFICADORES DE ROL
 # =============================================================================
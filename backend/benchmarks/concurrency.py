@@ -0,0 +1,235 @@
+# benchmarks/concurrency.py
+# Compara el techo de concurrencia del modo sincrono y el asincrono - Getsemani Vivo
+#
+# Crea una base SQLite temporal con datos de prueba, levanta la API con uvicorn
+# en cada modo (sqlite:// y sqlite+aiosqlite://) y la carga con un numero
+# creciente de clientes simultaneos. Para cada nivel reporta throughput,
+# latencias p50/p95 y errores; el techo es el nivel con mayor throughput.
+#
+# La cache del catalogo se desactiva para que cada request llegue a la base.
+#
+# Uso (desde la carpeta backend, con aiosqlite instalado):
+#   python benchmarks/concurrency.py
+#   python benchmarks/concurrency.py --levels 1,16,64,256 --requests 2000 --path /my-points
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    "sync": "sqlite:///{path}",
+    "async": "sqlite+aiosqlite:///{path}",
+}
+
+
+# =============================================================================
+# DATOS DE PRUEBA
+# =============================================================================
+
+def seed_database(path: str, businesses: int, consumptions: int) -> str:
+    """Crea la base de prueba y devuelve un token del usuario con consumos"""
+    os.environ["DATABASE_URL"] = MODES["sync"].format(path=path)
+    sys.path.insert(0, BACKEND_DIR)
+
+    import models
+    import crud
+    import migrations
+    from database import engine, SessionLocal
+    from auth import create_access_token
+
+    migrations.migrate(engine)
+    db = SessionLocal()
+    rng = random.Random(42)
+
+    db.bulk_insert_mappings(models.User, [
+        {"id": 1, "email": "owner@bench.local", "hashed_password": "x", "full_name": "Owner", "role": "business"},
+        {"id": 2, "email": "user@bench.local", "hashed_password": "x", "full_name": "User", "role": "user"},
+    ])
+    categories = ["bar", "restaurante", "cafe", "hostal", "tienda"]
+    db.bulk_insert_mappings(models.Business, [
+        {
+            "id": i,
+            "name": f"Negocio {i}",
+            "category": rng.choice(categories),
+            "address": f"Calle {i}",
+            "owner_id": 1,
+            "status": "approved",
+            "is_featured": i % 10 == 0,
+        }
+        for i in range(1, businesses + 1)
+    ])
+    db.bulk_insert_mappings(models.Consumption, [
+        {
+            "user_id": 2,
+            "business_id": rng.randint(1, businesses),
+            "amount": amount,
+            "points_earned": int(amount / 10000),
+            "registered_by_id": 1,
+        }
+        for amount in (rng.randint(5000, 200000) for _ in range(consumptions))
+    ])
+    db.commit()
+    crud.rebuild_points_balances(db)
+    db.close()
+    engine.dispose()
+
+    return create_access_token(data={"sub": "user@bench.local"})
+
+
+# =============================================================================
+# SERVIDOR
+# =============================================================================
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode: str, db_path: str, workdir: str, port: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DATABASE_URL=MODES[mode].format(path=db_path),
+        CATALOG_CACHE_TTL="0",
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR,
+         "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=workdir, env=env
+    )
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"El servidor en modo {mode} no arranco")
+
+
+# =============================================================================
+# CARGA
+# =============================================================================
+
+def run_level(port: int, path: str, headers: dict, concurrency: int, total: int, timeout: float) -> dict:
+    """total requests repartidos entre concurrency clientes con conexion persistente"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    per_client = max(total // concurrency, 1)
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+        mine = []
+        failed = 0
+        for _ in range(per_client):
+            started = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+                continue
+            mine.append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(p):
+        if not latencies:
+            return None
+        return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000, 2)
+
+    return {
+        "concurrency": concurrency,
+        "requests": per_client * concurrency,
+        "errors": errors[0],
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Techo de concurrencia: modo sincrono vs asincrono")
+    parser.add_argument("--levels", default="1,8,32,64,128", help="Clientes simultaneos por nivel")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests por nivel")
+    parser.add_argument("--path", default="/businesses?limit=20", help="Endpoint a medir (GET)")
+    parser.add_argument("--businesses", type=int, default=500)
+    parser.add_argument("--consumptions", type=int, default=5000)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por request en segundos")
+    parser.add_argument("--modes", default="sync,async")
+    parser.add_argument("--output", help="Guarda el reporte JSON en este archivo")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.levels.split(",")]
+    workdir = tempfile.mkdtemp(prefix="getsemani-bench-")
+    db_path = os.path.join(workdir, "bench.db")
+    token = seed_database(db_path, args.businesses, args.consumptions)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    report = {"path": args.path, "requests_per_level": args.requests, "modes": {}}
+    for mode in args.modes.split(","):
+        port = free_port()
+        process = start_server(mode, db_path, workdir, port)
+        try:
+            # Calentamiento: conexiones del pool, imports perezosos
+            run_level(port, args.path, headers, 4, 40, args.timeout)
+            results = []
+            for level in levels:
+                result = run_level(port, args.path, headers, level, args.requests, args.timeout)
+                results.append(result)
+                print(f"[{mode:5}] c={level:<4} {result['throughput_rps']:>8} req/s  "
+                      f"p50={result['p50_ms']}ms  p95={result['p95_ms']}ms  errores={result['errors']}")
+        finally:
+            process.terminate()
+            process.wait()
+
+        ceiling = max(results, key=lambda r: r["throughput_rps"])
+        report["modes"][mode] = {
+            "levels": results,
+            "ceiling_concurrency": ceiling["concurrency"],
+            "ceiling_rps": ceiling["throughput_rps"],
+        }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/serialization.py
+# Costo de serializacion por elemento de los listados - Getsemani Vivo
+#
+# Compara, para los schemas de los listados, el camino de FastAPI con
+# response_model (validar cada objeto con from_attributes, convertirlo a tipos
+# JSON y codificarlo con json.dumps) contra fastjson.dump_list (proyeccion
+# directa y codificacion con pydantic-core). Antes de medir verifica que ambos
+# caminos producen el mismo JSON.
+#
+# Los datos salen de una base SQLite en memoria y se cargan completos antes de
+# medir, de modo que solo se mide la serializacion.
+#
+# Uso (desde la carpeta backend):
+#   python benchmarks/serialization.py
+#   python benchmarks/serialization.py --sizes 10,50,100 --repeat 200
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import joinedload, selectinload
+
+import models
+import schemas
+import crud
+import fastjson
+from query_checks import build_check_engine
+
+
+def seed(db, rows: int):
+    owner = models.User(email="owner@bench.local", hashed_password="x", role="business", full_name="Dueno")
+    client = models.User(email="client@bench.local", hashed_password="x", role="user", full_name="Cliente")
+    db.add_all([owner, client])
+    db.flush()
+
+    businesses = [
+        models.Business(
+            name=f"Negocio {i}", description="Bar con musica en vivo en la plaza de la Trinidad",
+            address=f"Calle del Espiritu Santo #{i}", category="bar", status="approved",
+            latitude=10.4220 + i / 10000, longitude=-75.5460, owner_id=owner.id,
+            schedule_monday="12:00 - 23:00", schedule_friday="12:00 - 02:00"
+        )
+        for i in range(rows)
+    ]
+    db.add_all(businesses)
+    db.flush()
+
+    variants = {
+        name: {"url": f"/uploads/businesses/x_{name}.jpg", "webp_url": f"/uploads/businesses/x_{name}.webp", "width": size, "height": size}
+        for name, size in (("thumb", 200), ("card", 640), ("full", 1600))
+    }
+    for business in businesses:
+        for order in range(3):
+            db.add(models.BusinessImage(
+                business_id=business.id, filename="x.jpg", url="/uploads/businesses/x.jpg",
+                order=order, is_primary=order == 0, variants=variants
+            ))
+    # Todos los consumos en el primer negocio, para que ambos historiales tengan paginas completas
+    for _ in businesses:
+        db.add(models.Consumption(
+            user_id=client.id, business_id=businesses[0].id, amount=45000, points_earned=4,
+            description="Cierre de mesa", registered_by_id=owner.id
+        ))
+    db.commit()
+    return client.id, businesses[0].id
+
+
+def response_model_path(adapter: TypeAdapter, items) -> bytes:
+    """Lo que hace FastAPI con response_model: validar, convertir y json.dumps"""
+    value = adapter.validate_python(items, from_attributes=True)
+    data = adapter.dump_python(value, mode="json")
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo de serializacion por elemento: response_model vs fastjson")
+    parser.add_argument("--sizes", default="1,50,100", help="Tamanos de pagina a medir")
+    parser.add_argument("--repeat", type=int, default=100, help="Repeticiones por medicion")
+    parser.add_argument("--output", help="Guarda el reporte JSON en este archivo")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    engine, BenchSession = build_check_engine()
+    db = BenchSession()
+    client_id, business_id = seed(db, max(sizes))
+
+    # Todo cargado de antemano: se mide solo la serializacion
+    businesses = db.query(models.Business).options(
+        selectinload(models.Business.images), joinedload(models.Business.owner)
+    ).order_by(models.Business.id).all()
+    datasets = {
+        "BusinessSimple": (schemas.BusinessSimple, businesses),
+        "Business": (schemas.Business, businesses),
+        "BusinessWithOwner": (schemas.BusinessWithOwner, businesses),
+        "UserSimple": (schemas.UserSimple, db.query(models.User).all() * max(sizes)),
+        "ConsumptionWithDetails": (schemas.ConsumptionWithDetails, crud.get_user_consumption_history(db, client_id, limit=max(sizes))),
+        "ConsumptionWithUser": (schemas.ConsumptionWithUser, crud.get_business_consumption_history(db, business_id, limit=max(sizes))),
+    }
+
+    report = {"repeat": args.repeat, "schemas": {}}
+    print(f"{'schema':<24}{'items':>6}{'response_model us/item':>26}{'fastjson us/item':>20}{'speedup':>10}")
+    for name, (schema, items) in datasets.items():
+        adapter = TypeAdapter(List[schema])
+        report["schemas"][name] = []
+        for size in sizes:
+            page = items[:size]
+            expected = json.loads(response_model_path(adapter, page))
+            actual = json.loads(fastjson.dump_list(schema, page))
+            if expected != actual:
+                print(f"⚠️  {name}: fastjson produce un JSON distinto al de response_model")
+                return 1
+
+            before = timeit.timeit(lambda: response_model_path(adapter, page), number=args.repeat)
+            after = timeit.timeit(lambda: fastjson.dump_list(schema, page), number=args.repeat)
+            per_item_before = before / args.repeat / len(page) * 1e6
+            per_item_after = after / args.repeat / len(page) * 1e6
+            report["schemas"][name].append({
+                "items": len(page),
+                "response_model_us_per_item": round(per_item_before, 2),
+                "fastjson_us_per_item": round(per_item_after, 2),
+                "speedup": round(before / after, 2)
+            })
+            print(f"{name:<24}{len(page):>6}{per_item_before:>26.2f}{per_item_after:>20.2f}{before / after:>9.1f}x")
+
+    db.close()
+    engine.dispose()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+# benchmarks/startup.py
+# Tiempo de arranque de un proceso del servidor - Getsemani Vivo
+#
+# Mide, en procesos nuevos de Python, cuanto tarda "import main" y cuanto el
+# inicio de la aplicacion (lifespan: verificacion del esquema y reporte de la
+# base de datos), y lista los modulos que mas tiempo toman al importarse
+# (python -X importtime). Termina con codigo 1 si la mediana supera el
+# presupuesto, para usarlo en CI antes de desplegar.
+#
+# La base de prueba se migra una vez antes de medir: las corridas medidas
+# solo consultan la version del esquema, como un worker en produccion.
+#
+# Uso (desde la carpeta backend):
+#   python benchmarks/startup.py
+#   python benchmarks/startup.py --runs 10 --budget-ms 1500 --output startup.json
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Se ejecuta en cada proceso medido; la ultima linea es el resultado
+MEASURE_SCRIPT = """
+import asyncio, json, sys, time
+sys.path.insert(0, {backend!r})
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def boot():
+    async with main.lifespan(main.app):
+        pass
+
+asyncio.run(boot())
+ready = time.perf_counter()
+print("RESULT " + json.dumps({{"import_ms": (imported - started) * 1000, "lifespan_ms": (ready - imported) * 1000}}))
+"""
+
+MIGRATE_SCRIPT = """
+import sys
+sys.path.insert(0, {backend!r})
+import database, migrations
+migrations.migrate(database.engine)
+"""
+
+
+def project_modules() -> set:
+    return {name[:-3] for name in os.listdir(BACKEND_DIR) if name.endswith(".py")}
+
+
+def parse_importtime(stderr: str) -> dict:
+    """{modulo: (tiempo propio us, tiempo acumulado us, profundidad)} de la salida de -X importtime"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        self_us, cumulative_us, raw_name = int(parts[0]), int(parts[1]), parts[2]
+        depth = (len(raw_name) - len(raw_name.lstrip(" ")) - 1) // 2
+        modules[raw_name.strip()] = (self_us, cumulative_us, depth)
+    return modules
+
+
+def run_once(workdir: str, env: dict) -> tuple:
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", MEASURE_SCRIPT.format(backend=BACKEND_DIR)],
+        cwd=workdir, env=env, capture_output=True, text=True
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"El proceso medido fallo:\n{process.stderr[-2000:]}")
+    result_line = [line for line in process.stdout.splitlines() if line.startswith("RESULT ")][-1]
+    return json.loads(result_line[len("RESULT "):]), parse_importtime(process.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de importacion y arranque del servidor")
+    parser.add_argument("--runs", type=int, default=5, help="Procesos a medir")
+    parser.add_argument("--budget-ms", type=float, default=2000, help="Presupuesto de import + lifespan (mediana)")
+    parser.add_argument("--top", type=int, default=15, help="Modulos a listar")
+    parser.add_argument("--output", help="Guarda el reporte JSON en este archivo")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="getsemani-startup-")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'startup.db')}", MIGRATE_ON_STARTUP="false")
+    subprocess.run([sys.executable, "-c", MIGRATE_SCRIPT.format(backend=BACKEND_DIR)], cwd=workdir, env=env, check=True)
+
+    timings = []
+    runs = []
+    for _ in range(args.runs):
+        timing, modules = run_once(workdir, env)
+        timings.append(timing)
+        runs.append(modules)
+
+    import_ms = statistics.median(t["import_ms"] for t in timings)
+    lifespan_ms = statistics.median(t["lifespan_ms"] for t in timings)
+    total_ms = import_ms + lifespan_ms
+
+    # Tiempos por modulo: mediana entre corridas
+    names = set.intersection(*(set(modules) for modules in runs))
+    median_self = {name: statistics.median(modules[name][0] for modules in runs) / 1000 for name in names}
+    median_cumulative = {name: statistics.median(modules[name][1] for modules in runs) / 1000 for name in names}
+    own = project_modules()
+
+    heaviest = sorted(names, key=lambda name: -median_self[name])[:args.top]
+    project = sorted((name for name in names if name in own), key=lambda name: -median_cumulative[name])
+
+    print(f"{'import main':<28}{import_ms:>10.1f} ms")
+    print(f"{'lifespan':<28}{lifespan_ms:>10.1f} ms")
+    print(f"{'total':<28}{total_ms:>10.1f} ms   (presupuesto {args.budget_ms:.0f} ms)")
+    print()
+    print(f"Modulos del proyecto (acumulado, incluye lo que importan):")
+    for name in project:
+        print(f"   {name:<25}{median_cumulative[name]:>10.1f} ms")
+    print()
+    print(f"Modulos con mas tiempo propio:")
+    for name in heaviest:
+        print(f"   {name:<45}{median_self[name]:>10.1f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "runs": args.runs,
+                "import_ms": round(import_ms, 1),
+                "lifespan_ms": round(lifespan_ms, 1),
+                "total_ms": round(total_ms, 1),
+                "budget_ms": args.budget_ms,
+                "project_modules_ms": {name: round(median_cumulative[name], 1) for name in project},
+                "heaviest_modules_ms": {name: round(median_self[name], 1) for name in heaviest},
+            }, f, indent=2)
+
+    print()
+    if total_ms > args.budget_ms:
+        print(f"⚠️  El arranque ({total_ms:.0f} ms) supera el presupuesto de {args.budget_ms:.0f} ms")
+        return 1
+    print(f"✅ Arranque dentro del presupuesto")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# cache.py
+# Cache en memoria con expiracion (TTL) y reemplazo LRU - Getsemani Vivo
+#
+# catalog_cache guarda las respuestas ya serializadas de los endpoints publicos
+# de negocios. crud.py la invalida cuando cambia un negocio o sus imagenes.
+#
+# Las dos caches viven en la memoria de cada proceso y la invalidacion solo
+# limpia la del proceso que atendio el cambio. Con varios workers (uvicorn
+# --workers, gunicorn) los demas siguen sirviendo la respuesta anterior, con su
+# ETag, hasta que vence CATALOG_CACHE_TTL. El TTL es el retraso maximo con que
+# un cambio llega a todos los workers: mantenerlo corto si hay varios.
+#
+# En principal_cache eso afecta la seguridad: al desactivar un usuario o
+# cambiar su rol, los otros workers siguen autorizando los datos anteriores
+# durante PRINCIPAL_CACHE_TTL. Por eso el TTL por defecto es corto (10 s);
+# si la revocacion debe ser inmediata con varios workers, usar
+# PRINCIPAL_CACHE_ENABLED=false.
+#
+# principal_cache guarda el usuario autenticado de cada token para no
+# consultarlo en cada request. crud.py la invalida al cambiar el usuario.
+#
+# Variables de entorno:
+#   CATALOG_CACHE_TTL         segundos que vive una respuesta (0 desactiva la cache, por defecto 30)
+#   CATALOG_CACHE_SIZE        numero maximo de respuestas guardadas (por defecto 512)
+#   PRINCIPAL_CACHE_ENABLED   "false" desactiva la cache de usuarios autenticados
+#   PRINCIPAL_CACHE_TTL       segundos que vive un usuario en la cache (por defecto 10)
+#   PRINCIPAL_CACHE_SIZE      numero maximo de usuarios guardados (por defecto 1024)
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from fastapi import Request, Response
+
+
+class TTLCache:
+    """Cache LRU acotada cuyas entradas expiran despues de ttl segundos (segura entre hilos)"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # Aumenta en cada invalidacion; evita guardar un valor leido antes de invalidar
+        self.generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.maxsize > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self.generation += 1
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        with self._lock:
+            self.generation += 1
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# =============================================================================
+# CACHE DEL CATALOGO PUBLICO
+# =============================================================================
+
+catalog_cache = TTLCache(
+    maxsize=int(os.getenv("CATALOG_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("CATALOG_CACHE_TTL", "30"))
+)
+
+# Claves: ("list", ...parametros), ("featured",), ("detail", id), ("images", id)
+LIST_KEYS = ("list", "featured")
+BUSINESS_KEYS = ("detail", "images")
+
+
+def invalidate_business(business_id: int) -> None:
+    """Descarta los listados y las respuestas del negocio indicado"""
+    catalog_cache.delete_where(
+        lambda key: key[0] in LIST_KEYS or (key[0] in BUSINESS_KEYS and key[1] == business_id)
+    )
+
+
+# =============================================================================
+# CACHE DE USUARIOS AUTENTICADOS
+# =============================================================================
+
+PRINCIPAL_CACHE_ENABLED = os.getenv("PRINCIPAL_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Clave: email del token (campo "sub")
+principal_cache = TTLCache(
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", "10")) if PRINCIPAL_CACHE_ENABLED else 0
+)
+
+
+def invalidate_principal(*emails: Optional[str]) -> None:
+    """Descarta el usuario guardado para cada email indicado"""
+    for email in emails:
+        if email:
+            principal_cache.delete(email)
+
+
+# =============================================================================
+# RESPUESTAS SERIALIZADAS
+# =============================================================================
+
+class CachedResponse:
+    """Cuerpo JSON ya serializado con su ETag y cabeceras extra"""
+
+    def __init__(self, body: bytes, headers: Optional[Dict[str, str]] = None):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.headers = headers or {}
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates or "*" in candidates
+
+
+def _respond(request: Request, entry: CachedResponse) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", **entry.headers}
+    if _etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+def cached_json(request: Request, key: Hashable, build: Callable[[], CachedResponse]) -> Response:
+    """
+    Devuelve la respuesta guardada para key o la construye con build().
+    Responde 304 si el cliente envia un If-None-Match con el ETag actual.
+    """
+    entry = catalog_cache.get(key)
+    if entry is None:
+        generation = catalog_cache.generation
+        entry = build()
+        catalog_cache.set(key, entry, generation=generation)
+    return _respond(request, entry)
+
+
+async def cached_json_async(
+    request: Request, key: Hashable, build: Callable[[], Awaitable[CachedResponse]]
+) -> Response:
+    """Igual que cached_json, con build() asincrono (modo asincrono)"""
+    entry = catalog_cache.get(key)
+    if entry is None:
+        generation = catalog_cache.generation
+        entry = await build()
+        catalog_cache.set(key, entry, generation=generation)
+    return _respond(request, entry)
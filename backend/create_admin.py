@@ -4,13 +4,8 @@
 
 from database import SessionLocal, engine
 import models
-from passlib.context import CryptContext
-
-# Crear las tablas si no existen
-models.Base.metadata.create_all(bind=engine)
-
-# Configuración de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+import migrations
+from passwords import pwd_context
 
 # =============================================================================
 # DATOS DEL ADMINISTRADOR (CAMBIA ESTOS VALORES)
@@ -25,6 +20,8 @@ ADMIN_NAME = "Camilo"
 # =============================================================================
 
 def create_first_admin():
+    # Aplicar las migraciones pendientes (crea las tablas en una base nueva)
+    migrations.migrate(engine)
     db = SessionLocal()
     
     try:
@@ -1,15 +1,18 @@
 # crud.py
 # Operaciones CRUD - Getsemani Vivo
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from passlib.context import CryptContext
-from typing import Optional, List
+from sqlalchemy.orm import Session, selectinload, joinedload
+from sqlalchemy import func, and_, or_, insert
+from datetime import date
+from typing import Optional, List, Sequence, Tuple
 
 import models
 import schemas
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+import geo
+import search
+import cache
+import passwords
+import stats
 
 
 # =============================================================================
@@ -24,16 +27,21 @@ def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_users(db: Session, skip: int = 0, limit: int = 100, after: Optional[Tuple] = None):
+    query = db.query(models.User).order_by(models.User.id)
+    if after:
+        return query.filter(models.User.id > after[0]).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
 
 
 def get_users_by_role(db: Session, role: str, skip: int = 0, limit: int = 100):
     return db.query(models.User).filter(models.User.role == role).offset(skip).limit(limit).all()
 
 
-def create_user(db: Session, user: schemas.UserCreate, role: str = "user"):
-    hashed_password = pwd_context.hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, role: str = "user", hashed_password: Optional[str] = None):
+    # Quien ya calculo el hash (p. ej. con passwords.hash_password_async) lo pasa listo
+    if hashed_password is None:
+        hashed_password = passwords.hash_password(user.password)
     db_user = models.User(
         email=user.email,
         hashed_password=hashed_password,
@@ -51,10 +59,12 @@ def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate):
     db_user = get_user(db, user_id)
     if not db_user:
         return None
+    previous_email = db_user.email
     update_data = user_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_user, field, value)
     db.commit()
+    cache.invalidate_principal(previous_email, db_user.email)
     db.refresh(db_user)
     return db_user
 
@@ -65,6 +75,7 @@ def update_user_role(db: Session, user_id: int, new_role: str):
         return None
     db_user.role = new_role
     db.commit()
+    cache.invalidate_principal(db_user.email)
     db.refresh(db_user)
     return db_user
 
@@ -75,6 +86,7 @@ def deactivate_user(db: Session, user_id: int):
         return None
     db_user.is_active = False
     db.commit()
+    cache.invalidate_principal(db_user.email)
     db.refresh(db_user)
     return db_user
 
@@ -85,6 +97,7 @@ def activate_user(db: Session, user_id: int):
         return None
     db_user.is_active = True
     db.commit()
+    cache.invalidate_principal(db_user.email)
     db.refresh(db_user)
     return db_user
 
@@ -93,6 +106,13 @@ def activate_user(db: Session, user_id: int):
 # OPERACIONES DE NEGOCIO
 # =============================================================================
 
+# Perfiles de carga: relaciones que se traen junto con los negocios, segun el
+# schema que serializa cada endpoint. Sin perfil, images y owner se cargan de
+# forma perezosa con una consulta por negocio al serializar.
+LOAD_IMAGES = (selectinload(models.Business.images),)
+LOAD_IMAGES_AND_OWNER = LOAD_IMAGES + (joinedload(models.Business.owner),)
+
+
 def get_business(db: Session, business_id: int):
     return db.query(models.Business).filter(models.Business.id == business_id).first()
 
@@ -103,9 +123,11 @@ def get_businesses(
     limit: int = 100,
     category: Optional[str] = None,
     status: Optional[str] = None,
-    only_approved: bool = False
+    only_approved: bool = False,
+    after: Optional[Tuple] = None,
+    load: Sequence = ()
 ):
-    query = db.query(models.Business)
+    query = db.query(models.Business).options(*load)
     
     if only_approved:
         query = query.filter(models.Business.status == "approved")
@@ -115,11 +137,14 @@ def get_businesses(
     if category:
         query = query.filter(models.Business.category == category)
     
+    query = query.order_by(models.Business.id)
+    if after:
+        return query.filter(models.Business.id > after[0]).limit(limit).all()
     return query.offset(skip).limit(limit).all()
 
 
-def get_businesses_by_owner(db: Session, owner_id: int):
-    return db.query(models.Business).filter(models.Business.owner_id == owner_id).all()
+def get_businesses_by_owner(db: Session, owner_id: int, load: Sequence = ()):
+    return db.query(models.Business).options(*load).filter(models.Business.owner_id == owner_id).all()
 
 
 def get_featured_businesses(db: Session, limit: int = 10):
@@ -129,6 +154,66 @@ def get_featured_businesses(db: Session, limit: int = 10):
     ).limit(limit).all()
 
 
+def get_nearby_businesses(
+    db: Session,
+    latitude: float,
+    longitude: float,
+    radius_m: float,
+    limit: int = 20,
+    category: Optional[str] = None
+):
+    """
+    Negocios aprobados a menos de radius_m metros, ordenados por distancia.
+    Solo lee los negocios de las celdas de geohash que cubren el radio.
+    """
+    # Cada celda es un rango del indice (status, geohash)
+    cells = []
+    for prefix in geo.covering_prefixes(latitude, longitude, radius_m):
+        cell = [models.Business.status == "approved", models.Business.geohash >= prefix]
+        upper = geo.prefix_upper_bound(prefix)
+        if upper is not None:
+            cell.append(models.Business.geohash < upper)
+        cells.append(and_(*cell))
+    
+    query = db.query(models.Business).filter(or_(*cells))
+    if category:
+        query = query.filter(models.Business.category == category)
+    
+    results = []
+    for business in query.all():
+        distance = geo.haversine_m(latitude, longitude, business.latitude, business.longitude)
+        if distance <= radius_m:
+            results.append((distance, business))
+    results.sort(key=lambda r: r[0])
+    
+    return [
+        {
+            "id": b.id,
+            "name": b.name,
+            "category": b.category,
+            "address": b.address,
+            "status": b.status,
+            "is_featured": b.is_featured,
+            "latitude": b.latitude,
+            "longitude": b.longitude,
+            "distance_m": round(distance, 1)
+        }
+        for distance, b in results[:limit]
+    ]
+
+
+def rebuild_geohashes(db: Session):
+    """Recalcula el geohash de todos los negocios desde su latitud y longitud"""
+    updated = 0
+    for business in db.query(models.Business).all():
+        geohash = geo.geohash_for(business.latitude, business.longitude)
+        if business.geohash != geohash:
+            business.geohash = geohash
+            updated += 1
+    db.commit()
+    return updated
+
+
 def create_business(db: Session, business: schemas.BusinessCreate, owner_id: int):
     db_business = models.Business(
         name=business.name,
@@ -141,6 +226,7 @@ def create_business(db: Session, business: schemas.BusinessCreate, owner_id: int
         address=business.address,
         latitude=business.latitude,
         longitude=business.longitude,
+        geohash=geo.geohash_for(business.latitude, business.longitude),
         schedule_monday=business.schedule_monday,
         schedule_tuesday=business.schedule_tuesday,
         schedule_wednesday=business.schedule_wednesday,
@@ -153,6 +239,8 @@ def create_business(db: Session, business: schemas.BusinessCreate, owner_id: int
         status="pending"
     )
     db.add(db_business)
+    db.flush()
+    search.index_business(db, db_business)
     db.commit()
     db.refresh(db_business)
     return db_business
@@ -171,7 +259,14 @@ def update_business(db: Session, business_id: int, business_update: schemas.Busi
     for field, value in update_data.items():
         setattr(db_business, field, value)
     
+    if 'latitude' in update_data or 'longitude' in update_data:
+        db_business.geohash = geo.geohash_for(db_business.latitude, db_business.longitude)
+    
+    if any(field in update_data for field in search.SEARCH_FIELDS):
+        search.index_business(db, db_business)
+    
     db.commit()
+    cache.invalidate_business(business_id)
     db.refresh(db_business)
     return db_business
 
@@ -182,6 +277,7 @@ def update_business_status(db: Session, business_id: int, new_status: str):
         return None
     db_business.status = new_status
     db.commit()
+    cache.invalidate_business(business_id)
     db.refresh(db_business)
     return db_business
 
@@ -192,6 +288,7 @@ def toggle_featured(db: Session, business_id: int):
         return None
     db_business.is_featured = not db_business.is_featured
     db.commit()
+    cache.invalidate_business(business_id)
     db.refresh(db_business)
     return db_business
 
@@ -200,8 +297,15 @@ def delete_business(db: Session, business_id: int):
     db_business = get_business(db, business_id)
     if not db_business:
         return None
+    remove_business_points(db, business_id)
+    db.query(models.BusinessDailyStats).filter(
+        models.BusinessDailyStats.business_id == business_id
+    ).delete(synchronize_session=False)
+    search.remove_business(db, business_id)
+    # Las filas de imagenes se borran en cascada; sus archivos, con "maintenance.py images gc"
     db.delete(db_business)
     db.commit()
+    cache.invalidate_business(business_id)
     return True
 
 
@@ -234,6 +338,7 @@ def create_business_image(db: Session, business_id: int, filename: str, url: str
     
     db.add(db_image)
     db.commit()
+    cache.invalidate_business(business_id)
     db.refresh(db_image)
     return db_image
 
@@ -250,13 +355,48 @@ def get_image(db: Session, image_id: int):
     return db.query(models.BusinessImage).filter(models.BusinessImage.id == image_id).first()
 
 
+def set_image_variants(db: Session, image_id: int, variants: dict):
+    """Guarda las variantes generadas. Devuelve False si la imagen ya no existe."""
+    db_image = get_image(db, image_id)
+    if not db_image:
+        return False
+    db_image.variants = variants
+    db.commit()
+    cache.invalidate_business(db_image.business_id)
+    return True
+
+
+def get_image_filenames(db: Session) -> set:
+    """Archivos que usa alguna imagen, para que maintenance.py borre los demas"""
+    return {row.filename for row in db.query(models.BusinessImage.filename).distinct()}
+
+
+def get_variants_for_filename(db: Session, filename: str):
+    """Variantes ya generadas para el archivo por otra imagen, o None"""
+    row = db.query(models.BusinessImage.variants).filter(
+        models.BusinessImage.filename == filename,
+        models.BusinessImage.variants.isnot(None)
+    ).first()
+    return row.variants if row else None
+
+
+def get_images_for_variants(db: Session, include_processed: bool = False):
+    """Imagenes sin variantes (o todas), para generarlas con maintenance.py"""
+    query = db.query(models.BusinessImage.id, models.BusinessImage.filename)
+    if not include_processed:
+        query = query.filter(models.BusinessImage.variants.is_(None))
+    return query.order_by(models.BusinessImage.id).all()
+
+
 def delete_image(db: Session, image_id: int):
     """Elimina una imagen"""
     db_image = get_image(db, image_id)
     if not db_image:
         return None
+    business_id = db_image.business_id
     db.delete(db_image)
     db.commit()
+    cache.invalidate_business(business_id)
     return True
 
 
@@ -275,6 +415,7 @@ def set_primary_image(db: Session, image_id: int):
     # Establecer esta como principal
     db_image.is_primary = True
     db.commit()
+    cache.invalidate_business(db_image.business_id)
     db.refresh(db_image)
     return db_image
 
@@ -283,6 +424,11 @@ def set_primary_image(db: Session, image_id: int):
 # OPERACIONES DE CONSUMO (PUNTOS)
 # =============================================================================
 
+def points_for_amount(amount: float, points_per_10000: int) -> int:
+    """Puntos que genera un consumo: points_per_10000 por cada $10,000 COP"""
+    return int(amount / 10000) * points_per_10000
+
+
 def create_consumption(
     db: Session,
     user_id: int,
@@ -295,7 +441,7 @@ def create_consumption(
     if not business:
         return None
     
-    points_earned = int(amount / 10000) * business.points_per_10000
+    points_earned = points_for_amount(amount, business.points_per_10000)
     
     db_consumption = models.Consumption(
         user_id=user_id,
@@ -307,81 +453,585 @@ def create_consumption(
     )
     
     db.add(db_consumption)
+    apply_points(db, user_id, business_id, points_earned, amount)
+    apply_daily_stats(db, business_id, stats.local_day(), 1, amount, points_earned)
     db.commit()
     db.refresh(db_consumption)
     
     return db_consumption
 
 
-def get_user_consumptions(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Consumption).filter(
+def create_consumptions_bulk(
+    db: Session,
+    business: models.Business,
+    entries: List[schemas.ConsumptionCreate],
+    registered_by_id: int
+):
+    """
+    Registra varios consumos de un negocio en una sola transaccion.
+    Busca todos los clientes en una consulta, inserta los consumos en lote y
+    actualiza los saldos una vez por cliente. Devuelve un resultado por
+    entrada, en el mismo orden: los puntos generados o el motivo del error.
+    """
+    emails = {entry.user_email for entry in entries}
+    user_ids = dict(
+        db.query(models.User.email, models.User.id).filter(models.User.email.in_(emails)).all()
+    ) if emails else {}
+    
+    results = []
+    rows = []
+    for entry in entries:
+        result = {"user_email": entry.user_email, "amount": entry.amount}
+        results.append(result)
+        
+        user_id = user_ids.get(entry.user_email)
+        if user_id is None:
+            result["error"] = f"No existe usuario con email: {entry.user_email}"
+            continue
+        
+        result["user_id"] = user_id
+        result["points_earned"] = points_for_amount(entry.amount, business.points_per_10000)
+        rows.append({
+            "user_id": user_id,
+            "business_id": business.id,
+            "amount": entry.amount,
+            "points_earned": result["points_earned"],
+            "description": entry.description,
+            "registered_by_id": registered_by_id
+        })
+    
+    if not rows:
+        return results
+    
+    # executemany: una sola sentencia para todas las filas (sin RETURNING, que
+    # en SQLite obligaria a insertar fila por fila para conservar el orden)
+    db.execute(insert(models.Consumption), rows)
+    
+    # Saldos: un solo incremento por cliente con la suma de sus consumos
+    totals = {}
+    for values in rows:
+        points, amount, visits = totals.get(values["user_id"], (0, 0.0, 0))
+        totals[values["user_id"]] = (points + values["points_earned"], amount + values["amount"], visits + 1)
+    
+    for user_id, (points, amount, visits) in totals.items():
+        apply_points(db, user_id, business.id, points, amount, visits=visits)
+    
+    apply_daily_stats(
+        db, business.id, stats.local_day(), len(rows),
+        sum(values["amount"] for values in rows), sum(values["points_earned"] for values in rows)
+    )
+    db.commit()
+    return results
+
+
+def consumptions_after(after: Tuple):
+    """Condicion de los consumos posteriores al cursor (fecha, id) en orden descendente"""
+    created_at, consumption_id = after
+    return or_(
+        models.Consumption.created_at < created_at,
+        and_(
+            models.Consumption.created_at == created_at,
+            models.Consumption.id < consumption_id
+        )
+    )
+
+
+def _paginate_consumptions(query, skip: int, limit: int, after: Optional[Tuple]):
+    """Ordena por fecha descendente y pagina por cursor (fecha, id) o por offset"""
+    query = query.order_by(models.Consumption.created_at.desc(), models.Consumption.id.desc())
+    if after:
+        return query.filter(consumptions_after(after)).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
+
+
+def get_user_consumptions(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple] = None
+):
+    query = db.query(models.Consumption).filter(models.Consumption.user_id == user_id)
+    return _paginate_consumptions(query, skip, limit, after)
+
+
+def get_business_consumptions(
+    db: Session,
+    business_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple] = None
+):
+    query = db.query(models.Consumption).filter(models.Consumption.business_id == business_id)
+    return _paginate_consumptions(query, skip, limit, after)
+
+
+def get_user_consumption_history(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple] = None
+):
+    """Historial del usuario con los datos del negocio en una sola consulta (ConsumptionWithDetails)"""
+    query = db.query(
+        models.Consumption.id,
+        models.Consumption.amount,
+        models.Consumption.points_earned,
+        models.Consumption.description,
+        models.Business.name.label('business_name'),
+        models.Business.category.label('business_category'),
+        models.Consumption.created_at
+    ).join(
+        models.Business, models.Consumption.business_id == models.Business.id
+    ).filter(
         models.Consumption.user_id == user_id
-    ).order_by(models.Consumption.created_at.desc()).offset(skip).limit(limit).all()
+    )
+    return _paginate_consumptions(query, skip, limit, after)
 
 
-def get_business_consumptions(db: Session, business_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Consumption).filter(
+def get_business_consumption_history(
+    db: Session,
+    business_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple] = None
+):
+    """Consumos del negocio con los datos del cliente en una sola consulta (ConsumptionWithUser)"""
+    query = db.query(
+        models.Consumption.id,
+        models.Consumption.amount,
+        models.Consumption.points_earned,
+        models.Consumption.description,
+        models.User.email.label('user_email'),
+        models.User.full_name.label('user_name'),
+        models.Consumption.created_at
+    ).join(
+        models.User, models.Consumption.user_id == models.User.id
+    ).filter(
         models.Consumption.business_id == business_id
-    ).order_by(models.Consumption.created_at.desc()).offset(skip).limit(limit).all()
+    )
+    return _paginate_consumptions(query, skip, limit, after)
 
 
 def get_user_points_summary(db: Session, user_id: int):
+    """Lee el resumen de puntos desde los saldos mantenidos, sin recorrer los consumos"""
+    balance = db.query(models.UserPointsBalance).filter(
+        models.UserPointsBalance.user_id == user_id
+    ).first()
+    
+    if not balance:
+        return {
+            "total_points": 0,
+            "total_spent": 0,
+            "businesses_visited": 0,
+            "points_by_business": []
+        }
+    
     results = db.query(
-        models.Consumption.business_id,
+        models.UserBusinessPoints.business_id,
         models.Business.name.label('business_name'),
-        func.sum(models.Consumption.points_earned).label('total_points'),
-        func.sum(models.Consumption.amount).label('total_spent'),
-        func.count(models.Consumption.id).label('visit_count')
+        models.UserBusinessPoints.total_points,
+        models.UserBusinessPoints.total_spent,
+        models.UserBusinessPoints.visit_count
     ).join(
-        models.Business, models.Consumption.business_id == models.Business.id
+        models.Business, models.UserBusinessPoints.business_id == models.Business.id
     ).filter(
-        models.Consumption.user_id == user_id
-    ).group_by(
-        models.Consumption.business_id,
-        models.Business.name
+        models.UserBusinessPoints.user_id == user_id
+    ).order_by(
+        models.UserBusinessPoints.business_id
     ).all()
     
-    points_by_business = []
-    total_points = 0
-    total_spent = 0
-    
-    for r in results:
-        points_by_business.append({
+    points_by_business = [
+        {
             "business_id": r.business_id,
             "business_name": r.business_name,
-            "total_points": r.total_points or 0,
-            "total_spent": r.total_spent or 0,
-            "visit_count": r.visit_count or 0
-        })
-        total_points += r.total_points or 0
-        total_spent += r.total_spent or 0
+            "total_points": r.total_points,
+            "total_spent": r.total_spent,
+            "visit_count": r.visit_count
+        }
+        for r in results
+    ]
     
     return {
-        "total_points": total_points,
-        "total_spent": total_spent,
-        "businesses_visited": len(points_by_business),
+        "total_points": balance.total_points,
+        "total_spent": balance.total_spent,
+        "businesses_visited": balance.businesses_visited,
         "points_by_business": points_by_business
     }
 
 
-def get_business_customers(db: Session, business_id: int):
-    results = db.query(
-        models.User.id,
+def get_business_customers(
+    db: Session,
+    business_id: int,
+    skip: int = 0,
+    limit: int = 50,
+    after: Optional[Tuple] = None
+):
+    """
+    Clientes del negocio con mas puntos primero (empates: id de usuario
+    descendente). Lee los saldos por negocio, no el historial de consumos.
+    after: cursor (total_points, user_id) del ultimo cliente de la pagina anterior.
+    """
+    balance = models.UserBusinessPoints
+    query = db.query(
+        balance.user_id,
         models.User.email,
         models.User.full_name,
+        balance.total_points,
+        balance.total_spent,
+        balance.visit_count
+    ).join(
+        models.User, models.User.id == balance.user_id
+    ).filter(
+        balance.business_id == business_id
+    ).order_by(
+        balance.total_points.desc(),
+        balance.user_id.desc()
+    )
+    
+    if after:
+        total_points, user_id = after
+        return query.filter(or_(
+            balance.total_points < total_points,
+            and_(balance.total_points == total_points, balance.user_id < user_id)
+        )).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
+
+
+# =============================================================================
+# SALDOS DE PUNTOS
+# =============================================================================
+
+def apply_points(
+    db: Session,
+    user_id: int,
+    business_id: int,
+    points: int,
+    amount: float,
+    visits: int = 1
+):
+    """
+    Suma un consumo a los saldos del usuario (total y por negocio).
+    No hace commit: se confirma en la misma transaccion que el consumo.
+    """
+    by_business = models.UserBusinessPoints
+    balance = models.UserPointsBalance
+    business_increments = {
+        "total_points": by_business.total_points + points,
+        "total_spent": by_business.total_spent + amount,
+        "visit_count": by_business.visit_count + visits,
+        "updated_at": func.now()
+    }
+    
+    # INSERT ... ON CONFLICT DO UPDATE: el primer consumo de un cliente en dos
+    # cajas a la vez no choca al crear sus filas de saldo
+    upsert = _upsert_insert(db.get_bind().dialect.name)
+    if upsert is not None:
+        # visit_count solo crece, asi que si quedo igual a las visitas de este
+        # consumo la fila (usuario, negocio) es nueva
+        visit_count = db.execute(
+            upsert(by_business.__table__).values(
+                user_id=user_id, business_id=business_id,
+                total_points=points, total_spent=amount, visit_count=visits
+            ).on_conflict_do_update(
+                index_elements=["user_id", "business_id"], set_=business_increments
+            ).returning(by_business.visit_count)
+        ).scalar_one()
+        new_business = visit_count == visits
+        
+        db.execute(
+            upsert(balance.__table__).values(
+                user_id=user_id, total_points=points, total_spent=amount,
+                visit_count=visits, businesses_visited=1
+            ).on_conflict_do_update(index_elements=["user_id"], set_={
+                "total_points": balance.total_points + points,
+                "total_spent": balance.total_spent + amount,
+                "visit_count": balance.visit_count + visits,
+                "businesses_visited": balance.businesses_visited + (1 if new_business else 0),
+                # ON CONFLICT no aplica el onupdate del modelo
+                "updated_at": func.now()
+            })
+        )
+        return
+    
+    updated = db.query(by_business).filter(
+        by_business.user_id == user_id,
+        by_business.business_id == business_id
+    ).update(business_increments, synchronize_session=False)
+    
+    new_business = updated == 0
+    if new_business:
+        db.add(by_business(
+            user_id=user_id,
+            business_id=business_id,
+            total_points=points,
+            total_spent=amount,
+            visit_count=visits
+        ))
+        # autoflush=False: sin flush, otra llamada en la misma transaccion no veria la fila
+        db.flush()
+    
+    updated = db.query(balance).filter(
+        balance.user_id == user_id
+    ).update({
+        balance.total_points: balance.total_points + points,
+        balance.total_spent: balance.total_spent + amount,
+        balance.visit_count: balance.visit_count + visits,
+        balance.businesses_visited: balance.businesses_visited + (1 if new_business else 0)
+    }, synchronize_session=False)
+    
+    if updated == 0:
+        db.add(balance(
+            user_id=user_id,
+            total_points=points,
+            total_spent=amount,
+            visit_count=visits,
+            businesses_visited=1
+        ))
+        db.flush()
+
+
+def remove_business_points(db: Session, business_id: int):
+    """Descuenta de los saldos los puntos de un negocio que se va a eliminar. No hace commit."""
+    rows = db.query(models.UserBusinessPoints).filter(
+        models.UserBusinessPoints.business_id == business_id
+    ).all()
+    
+    for r in rows:
+        db.query(models.UserPointsBalance).filter(
+            models.UserPointsBalance.user_id == r.user_id
+        ).update({
+            models.UserPointsBalance.total_points: models.UserPointsBalance.total_points - r.total_points,
+            models.UserPointsBalance.total_spent: models.UserPointsBalance.total_spent - r.total_spent,
+            models.UserPointsBalance.visit_count: models.UserPointsBalance.visit_count - r.visit_count,
+            models.UserPointsBalance.businesses_visited: models.UserPointsBalance.businesses_visited - 1
+        }, synchronize_session=False)
+        db.delete(r)
+
+
+def _aggregate_points_from_consumptions(db: Session):
+    """Recalcula los totales por usuario y negocio a partir de la tabla de consumos"""
+    return db.query(
+        models.Consumption.user_id,
+        models.Consumption.business_id,
         func.sum(models.Consumption.points_earned).label('total_points'),
         func.sum(models.Consumption.amount).label('total_spent'),
         func.count(models.Consumption.id).label('visit_count')
     ).join(
-        models.Consumption, models.User.id == models.Consumption.user_id
-    ).filter(
-        models.Consumption.business_id == business_id
+        models.Business, models.Consumption.business_id == models.Business.id
     ).group_by(
-        models.User.id,
-        models.User.email,
-        models.User.full_name
-    ).order_by(
-        func.sum(models.Consumption.points_earned).desc()
+        models.Consumption.user_id,
+        models.Consumption.business_id
     ).all()
+
+
+def rebuild_points_balances(db: Session):
+    """Reconstruye todos los saldos de puntos desde la tabla de consumos"""
+    db.query(models.UserBusinessPoints).delete(synchronize_session=False)
+    db.query(models.UserPointsBalance).delete(synchronize_session=False)
+    
+    balances = {}
+    business_rows = []
+    for r in _aggregate_points_from_consumptions(db):
+        business_rows.append({
+            "user_id": r.user_id,
+            "business_id": r.business_id,
+            "total_points": r.total_points or 0,
+            "total_spent": r.total_spent or 0,
+            "visit_count": r.visit_count or 0
+        })
+        balance = balances.setdefault(r.user_id, {
+            "user_id": r.user_id,
+            "total_points": 0,
+            "total_spent": 0,
+            "visit_count": 0,
+            "businesses_visited": 0
+        })
+        balance["total_points"] += r.total_points or 0
+        balance["total_spent"] += r.total_spent or 0
+        balance["visit_count"] += r.visit_count or 0
+        balance["businesses_visited"] += 1
+    
+    if business_rows:
+        db.bulk_insert_mappings(models.UserBusinessPoints, business_rows)
+        db.bulk_insert_mappings(models.UserPointsBalance, list(balances.values()))
+    db.commit()
+    
+    return {"users": len(balances), "user_businesses": len(business_rows)}
+
+
+def verify_points_balances(db: Session, tolerance: float = 0.01):
+    """
+    Compara los saldos mantenidos con los totales recalculados desde los consumos.
+    Devuelve la lista de diferencias encontradas (vacia si todo cuadra).
+    """
+    expected_business = {}
+    expected_user = {}
+    for r in _aggregate_points_from_consumptions(db):
+        expected_business[(r.user_id, r.business_id)] = (
+            r.total_points or 0, r.total_spent or 0, r.visit_count or 0
+        )
+        points, spent, visits, businesses = expected_user.get(r.user_id, (0, 0, 0, 0))
+        expected_user[r.user_id] = (
+            points + (r.total_points or 0),
+            spent + (r.total_spent or 0),
+            visits + (r.visit_count or 0),
+            businesses + 1
+        )
+    
+    actual_business = {
+        (r.user_id, r.business_id): (r.total_points, r.total_spent, r.visit_count)
+        for r in db.query(models.UserBusinessPoints).all()
+    }
+    actual_user = {
+        r.user_id: (r.total_points, r.total_spent, r.visit_count, r.businesses_visited)
+        for r in db.query(models.UserPointsBalance).all()
+        if r.visit_count or r.businesses_visited
+    }
+    
+    def differs(a, b):
+        return a is None or b is None or any(abs(x - y) > tolerance for x, y in zip(a, b))
+    
+    mismatches = []
+    for key in sorted(set(expected_business) | set(actual_business)):
+        if differs(expected_business.get(key), actual_business.get(key)):
+            mismatches.append({
+                "user_id": key[0],
+                "business_id": key[1],
+                "expected": expected_business.get(key),
+                "actual": actual_business.get(key)
+            })
+    for user_id in sorted(set(expected_user) | set(actual_user)):
+        if differs(expected_user.get(user_id), actual_user.get(user_id)):
+            mismatches.append({
+                "user_id": user_id,
+                "business_id": None,
+                "expected": expected_user.get(user_id),
+                "actual": actual_user.get(user_id)
+            })
+    
+    return mismatches
+
+
+# =============================================================================
+# ESTADISTICAS DIARIAS
+# =============================================================================
+
+def _upsert_insert(dialect_name: str):
+    """
+    insert() con ON CONFLICT DO UPDATE del motor, o None si no lo tiene. El
+    dialecto se importa al usarlo: el de PostgreSQL no se carga con SQLite.
+    """
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert
+
+
+def apply_daily_stats(
+    db: Session,
+    business_id: int,
+    day: date,
+    consumptions: int,
+    amount: float,
+    points: int
+):
+    """
+    Suma consumos a la fila (negocio, dia) de las estadisticas.
+    No hace commit: se confirma en la misma transaccion que los consumos.
+    """
+    table = models.BusinessDailyStats
+    increments = {
+        "consumption_count": table.consumption_count + consumptions,
+        "total_amount": table.total_amount + amount,
+        "total_points": table.total_points + points
+    }
+    
+    # INSERT ... ON CONFLICT DO UPDATE: el primer consumo del dia de dos cajas a
+    # la vez no choca al crear la fila
+    upsert = _upsert_insert(db.get_bind().dialect.name)
+    if upsert is not None:
+        db.execute(
+            upsert(table).values(
+                business_id=business_id, day=day,
+                consumption_count=consumptions, total_amount=amount, total_points=points
+            ).on_conflict_do_update(index_elements=["business_id", "day"], set_=increments)
+        )
+        return
+    
+    updated = db.query(table).filter(
+        table.business_id == business_id,
+        table.day == day
+    ).update(increments, synchronize_session=False)
+    if updated == 0:
+        db.add(table(
+            business_id=business_id, day=day,
+            consumption_count=consumptions, total_amount=amount, total_points=points
+        ))
+        db.flush()
+
+
+def get_daily_stats(db: Session, start: date, end: date, business_id: Optional[int] = None):
+    """Totales por dia entre start y end (incluidos), de un negocio o de toda la plataforma"""
+    table = models.BusinessDailyStats
+    if business_id is not None:
+        return db.query(
+            table.day, table.consumption_count, table.total_amount, table.total_points
+        ).filter(
+            table.business_id == business_id,
+            table.day >= start,
+            table.day <= end
+        ).all()
+    
+    return db.query(
+        table.day,
+        func.sum(table.consumption_count).label("consumption_count"),
+        func.sum(table.total_amount).label("total_amount"),
+        func.sum(table.total_points).label("total_points")
+    ).filter(
+        table.day >= start,
+        table.day <= end
+    ).group_by(table.day).all()
+
+
+def rebuild_daily_stats(db: Session, batch_size: int = 10000):
+    """
+    Reconstruye las estadisticas diarias desde la tabla de consumos.
+    Recorre los consumos por lotes: el dia local se calcula en Python para no
+    depender de las funciones de fecha de cada motor.
+    """
+    db.query(models.BusinessDailyStats).delete(synchronize_session=False)
+    
+    totals = {}
+    consumptions = db.query(
+        models.Consumption.business_id,
+        models.Consumption.created_at,
+        models.Consumption.amount,
+        models.Consumption.points_earned
+    ).join(
+        models.Business, models.Consumption.business_id == models.Business.id
+    ).yield_per(batch_size)
+    for business_id, created_at, amount, points in consumptions:
+        key = (business_id, stats.local_day(created_at))
+        count, total_amount, total_points = totals.get(key, (0, 0.0, 0))
+        totals[key] = (count + 1, total_amount + amount, total_points + points)
+    
+    rows = [
+        {
+            "business_id": business_id,
+            "day": day,
+            "consumption_count": count,
+            "total_amount": total_amount,
+            "total_points": total_points
+        }
+        for (business_id, day), (count, total_amount, total_points) in totals.items()
+    ]
+    for i in range(0, len(rows), batch_size):
+        db.bulk_insert_mappings(models.BusinessDailyStats, rows[i:i + batch_size])
+    db.commit()
     
-    return results
\ No newline at end of file
+    return {"days": len(rows), "businesses": len({business_id for business_id, _ in totals})}
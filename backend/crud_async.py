@@ -0,0 +1,155 @@
+# crud_async.py
+# Lecturas asincronas para los endpoints mas usados - Getsemani Vivo
+#
+# Versiones con AsyncSession de las consultas de crud.py que atienden el
+# catalogo publico y los puntos del usuario. Solo se usan en modo asincrono
+# (ver database.py) y devuelven lo mismo que su equivalente en crud.py.
+#
+# Una AsyncSession no puede cargar relaciones de forma perezosa: todo lo que
+# se serializa despues se carga en la misma consulta (selectinload).
+
+from typing import Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+import models
+import crud
+
+
+# =============================================================================
+# NEGOCIOS
+# =============================================================================
+
+async def get_business(db: AsyncSession, business_id: int):
+    """Negocio con sus imagenes ya cargadas (schemas.Business)"""
+    result = await db.execute(
+        select(models.Business)
+        .options(selectinload(models.Business.images))
+        .where(models.Business.id == business_id)
+    )
+    return result.scalars().first()
+
+
+async def get_businesses(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    only_approved: bool = False,
+    after: Optional[Tuple] = None
+):
+    stmt = select(models.Business)
+
+    if only_approved:
+        stmt = stmt.where(models.Business.status == "approved")
+    elif status:
+        stmt = stmt.where(models.Business.status == status)
+
+    if category:
+        stmt = stmt.where(models.Business.category == category)
+
+    stmt = stmt.order_by(models.Business.id)
+    if after:
+        stmt = stmt.where(models.Business.id > after[0])
+    else:
+        stmt = stmt.offset(skip)
+
+    result = await db.execute(stmt.limit(limit))
+    return result.scalars().all()
+
+
+async def get_featured_businesses(db: AsyncSession, limit: int = 10):
+    result = await db.execute(
+        select(models.Business).where(
+            models.Business.is_featured == True,
+            models.Business.status == "approved"
+        ).limit(limit)
+    )
+    return result.scalars().all()
+
+
+# =============================================================================
+# PUNTOS DEL USUARIO
+# =============================================================================
+
+async def get_user_consumption_history(
+    db: AsyncSession,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Tuple] = None
+):
+    """Historial del usuario con los datos del negocio en una sola consulta (ConsumptionWithDetails)"""
+    stmt = select(
+        models.Consumption.id,
+        models.Consumption.amount,
+        models.Consumption.points_earned,
+        models.Consumption.description,
+        models.Business.name.label('business_name'),
+        models.Business.category.label('business_category'),
+        models.Consumption.created_at
+    ).join(
+        models.Business, models.Consumption.business_id == models.Business.id
+    ).where(
+        models.Consumption.user_id == user_id
+    ).order_by(
+        models.Consumption.created_at.desc(), models.Consumption.id.desc()
+    )
+
+    if after:
+        stmt = stmt.where(crud.consumptions_after(after))
+    else:
+        stmt = stmt.offset(skip)
+
+    result = await db.execute(stmt.limit(limit))
+    return result.all()
+
+
+async def get_user_points_summary(db: AsyncSession, user_id: int):
+    """Lee el resumen de puntos desde los saldos mantenidos, sin recorrer los consumos"""
+    balance = await db.get(models.UserPointsBalance, user_id)
+
+    if not balance:
+        return {
+            "total_points": 0,
+            "total_spent": 0,
+            "businesses_visited": 0,
+            "points_by_business": []
+        }
+
+    result = await db.execute(
+        select(
+            models.UserBusinessPoints.business_id,
+            models.Business.name.label('business_name'),
+            models.UserBusinessPoints.total_points,
+            models.UserBusinessPoints.total_spent,
+            models.UserBusinessPoints.visit_count
+        ).join(
+            models.Business, models.UserBusinessPoints.business_id == models.Business.id
+        ).where(
+            models.UserBusinessPoints.user_id == user_id
+        ).order_by(
+            models.UserBusinessPoints.business_id
+        )
+    )
+
+    points_by_business = [
+        {
+            "business_id": r.business_id,
+            "business_name": r.business_name,
+            "total_points": r.total_points,
+            "total_spent": r.total_spent,
+            "visit_count": r.visit_count
+        }
+        for r in result.all()
+    ]
+
+    return {
+        "total_points": balance.total_points,
+        "total_spent": balance.total_spent,
+        "businesses_visited": balance.businesses_visited,
+        "points_by_business": points_by_business
+    }
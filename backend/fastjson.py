@@ -0,0 +1,101 @@
+# fastjson.py
+# Serializacion rapida de listados - Getsemani Vivo
+#
+# Con response_model, FastAPI valida cada elemento devuelto contra el schema
+# (from_attributes), lo convierte a tipos JSON de Python y lo codifica con
+# json.dumps. En listados de 50 o 100 elementos eso domina el tiempo de CPU.
+#
+# dump_list proyecta cada fila directamente a los campos del schema, sin
+# volver a validarla (ya viene de la base con los tipos correctos), y la
+# codifica con el serializador en Rust de pydantic-core. Los campos bool e
+# int si se normalizan (0/1 de SQLite -> false/true). Los endpoints
+# conservan su response_model para la documentacion de la API.
+#
+# Medicion: python benchmarks/serialization.py
+
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Optional, Type, Union, get_args, get_origin
+
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined, to_json
+
+
+def _unwrap_optional(annotation):
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _is_model(annotation) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+# Tipos escalares que se normalizan: las consultas con text() y los dicts no
+# pasan por los tipos de SQLAlchemy, y SQLite devuelve los booleanos como 0/1
+SCALAR_COERCIONS = {bool: bool, int: int}
+
+
+def _field_converter(annotation) -> Optional[Callable[[Any], Any]]:
+    """Conversion de un valor segun su tipo: schemas anidados, bool e int; el resto pasa tal cual"""
+    annotation = _unwrap_optional(annotation)
+
+    coerce = SCALAR_COERCIONS.get(annotation) if isinstance(annotation, type) else None
+    if coerce is not None:
+        return lambda value: None if value is None else coerce(value)
+
+    if _is_model(annotation):
+        project = projector(annotation)
+        return lambda value: None if value is None else project(value)
+
+    if get_origin(annotation) is list:
+        (item_type,) = get_args(annotation) or (Any,)
+        item_type = _unwrap_optional(item_type)
+        if _is_model(item_type):
+            project = projector(item_type)
+            return lambda value: None if value is None else [project(v) for v in value]
+
+    return None
+
+
+@lru_cache(maxsize=None)
+def projector(schema: Type[BaseModel]) -> Callable[[Any], Dict[str, Any]]:
+    """Funcion que convierte un objeto ORM, una fila o un dict en el dict del schema"""
+    fields = [
+        (name, None if field.default is PydanticUndefined else field.default)
+        for name, field in schema.model_fields.items()
+    ]
+    converters = [
+        (name, convert)
+        for name, field in schema.model_fields.items()
+        if (convert := _field_converter(field.annotation)) is not None
+    ]
+
+    def project(item) -> Dict[str, Any]:
+        if isinstance(item, dict):
+            values = {name: item.get(name, default) for name, default in fields}
+        else:
+            values = {name: getattr(item, name, default) for name, default in fields}
+        for name, convert in converters:
+            values[name] = convert(values[name])
+        return values
+
+    return project
+
+
+def dump(schema: Type[BaseModel], item) -> bytes:
+    """JSON de un solo elemento"""
+    return to_json(projector(schema)(item))
+
+
+def dump_list(schema: Type[BaseModel], items: Iterable) -> bytes:
+    """JSON de una lista de elementos"""
+    project = projector(schema)
+    return to_json([project(item) for item in items])
+
+
+def list_response(schema: Type[BaseModel], items: Iterable, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Respuesta JSON de un listado, sin pasar por la validacion del response_model"""
+    return Response(content=dump_list(schema, items), media_type="application/json", headers=headers)
@@ -0,0 +1,132 @@
+# geo.py
+# Utilidades geograficas (geohash y distancias) - Getsemani Vivo
+#
+# Cada negocio guarda el geohash de su ubicacion. Los negocios cercanos a un
+# punto se buscan por rangos de prefijo de geohash (que usan el indice) y
+# luego se filtran y ordenan por distancia real.
+
+import math
+from typing import List, Optional, Tuple
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Precision guardada en la base (~5 metros)
+GEOHASH_PRECISION = 9
+
+EARTH_RADIUS_M = 6371000
+METERS_PER_DEGREE_LAT = 111320
+
+
+def encode_geohash(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Codifica una coordenada como geohash"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(geohash) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits = bits << 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits = bits << 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(geohash)
+
+
+def geohash_for(latitude, longitude):
+    """Geohash de un negocio, o None si no tiene ubicacion"""
+    if latitude is None or longitude is None:
+        return None
+    return encode_geohash(latitude, longitude)
+
+
+def cell_size_degrees(precision: int) -> Tuple[float, float]:
+    """Alto y ancho en grados de una celda de geohash"""
+    lat_bits = (5 * precision) // 2
+    lng_bits = 5 * precision - lat_bits
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Distancia en metros entre dos coordenadas"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def covering_prefixes(latitude: float, longitude: float, radius_m: float) -> List[str]:
+    """
+    Prefijos de geohash cuyas celdas cubren el circulo de busqueda.
+    Usa la celda mas pequena que sigue siendo mas grande que el radio, de modo
+    que el circulo queda cubierto por pocas celdas (9 como maximo).
+    """
+    d_lat = radius_m / METERS_PER_DEGREE_LAT
+    d_lng = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(latitude)), 0.01))
+
+    precision = 1
+    while precision < GEOHASH_PRECISION:
+        height, width = cell_size_degrees(precision + 1)
+        if height < d_lat or width < d_lng:
+            break
+        precision += 1
+
+    height, width = cell_size_degrees(precision)
+    lat_min, lat_max = max(latitude - d_lat, -90.0), min(latitude + d_lat, 90.0)
+    lng_min, lng_max = longitude - d_lng, longitude + d_lng
+
+    prefixes = []
+    lat = lat_min
+    while True:
+        lng = lng_min
+        while True:
+            wrapped = (lng + 180.0) % 360.0 - 180.0
+            prefix = encode_geohash(min(lat, 90.0 - 1e-9), wrapped, precision)
+            if prefix not in prefixes:
+                prefixes.append(prefix)
+            if lng >= lng_max:
+                break
+            lng = min(lng + width, lng_max)
+        if lat >= lat_max:
+            break
+        lat = min(lat + height, lat_max)
+
+    return prefixes
+
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """
+    Limite superior exclusivo de los geohash que empiezan con prefix: el
+    prefijo siguiente en el alfabeto base32 ("d2g" -> "d2h", "d2z" -> "d3").
+    Solo usa caracteres del alfabeto, cuyo orden es el mismo con la
+    intercalacion binaria de SQLite y con las de idioma de PostgreSQL (un
+    caracter fuera de el, como "~", no). None si no hay prefijo siguiente ("zz").
+    """
+    while prefix:
+        position = BASE32.index(prefix[-1])
+        if position + 1 < len(BASE32):
+            return prefix[:-1] + BASE32[position + 1]
+        prefix = prefix[:-1]
+    return None
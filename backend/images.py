@@ -0,0 +1,125 @@
+# images.py
+# Variantes redimensionadas de las imagenes de negocios - Getsemani Vivo
+#
+# Despues de guardar una imagen, se generan en segundo plano tres tamanos
+# (thumb, card, full), cada uno en JPG y WebP, junto al archivo original. Las
+# URLs quedan en la columna variants de la imagen y se exponen en
+# schemas.BusinessImage, para que las listas descarguen miniaturas en lugar
+# de la foto original.
+#
+# Las imagenes subidas antes de este cambio se procesan con:
+#   python maintenance.py images backfill
+#
+# Variables de entorno:
+#   IMAGE_WORKERS   hilos que generan variantes (por defecto 2)
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from PIL import Image, ImageOps
+
+from database import SessionLocal
+import crud
+import uploads
+
+logger = logging.getLogger(__name__)
+
+# Lado mayor maximo de cada variante, en pixeles (nunca se agranda la imagen)
+VARIANT_SIZES = {
+    "thumb": 200,
+    "card": 640,
+    "full": 1600,
+}
+
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("IMAGE_WORKERS", "2")),
+    thread_name_prefix="images"
+)
+
+
+def variant_filename(filename: str, variant: str, extension: str) -> str:
+    stem = filename.rsplit(".", 1)[0]
+    return f"{stem}_{variant}.{extension}"
+
+
+def generate_variants(filename: str, directory: str = uploads.BUSINESS_UPLOAD_DIR) -> Dict[str, dict]:
+    """
+    Crea las variantes de una imagen guardada y devuelve, por variante, sus
+    URLs (JPG y WebP) y sus dimensiones.
+    """
+    variants = {}
+    with Image.open(os.path.join(directory, filename)) as original:
+        # En JPG decodifica directamente a una escala reducida si la foto es muy grande
+        original.draft("RGB", (max(VARIANT_SIZES.values()),) * 2)
+        source = ImageOps.exif_transpose(original)
+
+    has_alpha = source.mode in ("RGBA", "LA") or "transparency" in source.info
+    source = source.convert("RGBA" if has_alpha else "RGB")
+
+    # De mayor a menor: cada variante se reduce desde la anterior
+    for variant, size in sorted(VARIANT_SIZES.items(), key=lambda item: -item[1]):
+        source.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+        jpg_name = variant_filename(filename, variant, "jpg")
+        webp_name = variant_filename(filename, variant, "webp")
+
+        if has_alpha:
+            # JPG no tiene transparencia: se compone sobre fondo blanco
+            flat = Image.new("RGB", source.size, (255, 255, 255))
+            flat.paste(source, mask=source.getchannel("A"))
+        else:
+            flat = source
+        flat.save(os.path.join(directory, jpg_name), "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        source.save(os.path.join(directory, webp_name), "WEBP", quality=WEBP_QUALITY, method=4)
+
+        variants[variant] = {
+            "url": uploads.public_url(jpg_name),
+            "webp_url": uploads.public_url(webp_name),
+            "width": source.width,
+            "height": source.height
+        }
+
+    return {variant: variants[variant] for variant in VARIANT_SIZES}
+
+
+# =============================================================================
+# PROCESAMIENTO EN SEGUNDO PLANO
+# =============================================================================
+
+def process_image(image_id: int, filename: str, reuse: bool = True) -> bool:
+    """
+    Genera las variantes de una imagen y las guarda en su fila. Si el mismo
+    archivo ya se proceso para otra imagen, reutiliza sus variantes.
+    """
+    variants = None
+    if reuse:
+        db = SessionLocal()
+        try:
+            variants = crud.get_variants_for_filename(db, filename)
+        finally:
+            db.close()
+
+    if variants is None:
+        try:
+            variants = generate_variants(filename)
+        except Exception:
+            logger.exception("No se pudieron generar las variantes de la imagen %s", image_id)
+            return False
+
+    # Si la imagen se elimino mientras se procesaba, sus variantes quedan para
+    # "maintenance.py images gc"
+    db = SessionLocal()
+    try:
+        return crud.set_image_variants(db, image_id, variants)
+    finally:
+        db.close()
+
+
+def schedule_variants(image_id: int, filename: str):
+    """Encola la generacion de variantes de una imagen recien creada"""
+    return executor.submit(process_image, image_id, filename)
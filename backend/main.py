@@ -1,25 +1,40 @@
 # main.py
 # API Principal de Getsemani Vivo
 
+import csv
+import io
 import os
-import uuid
-from datetime import timedelta
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
 from dotenv import load_dotenv
-from fastapi import FastAPI, Depends, HTTPException, status, Query, File, UploadFile
+from fastapi import FastAPI, Body, Depends, HTTPException, status, Query, File, UploadFile, Request
 from fastapi.security import OAuth2PasswordRequestForm
-from fastapi.staticfiles import StaticFiles
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from pydantic import ValidationError
+from typing import Any, List, Optional
 
-from database import engine, get_db
+import database
+from database import engine, get_db, get_read_db
 import models
 import schemas
 import crud
+import pagination
+import search
+import cache
+import fastjson
+import passwords
+import uploads
+import stats
+import migrations
+import metrics
 from auth import (
     authenticate_user,
     create_access_token,
     get_current_active_user,
+    get_user_read_db,
     require_admin,
     require_business,
     ACCESS_TOKEN_EXPIRE_MINUTES
@@ -28,16 +43,48 @@ from auth import (
 # Cargar variables de entorno
 load_dotenv()
 
-# Crear tablas
-models.Base.metadata.create_all(bind=engine)
+# En desarrollo las migraciones se aplican al iniciar; en produccion se
+# aplican antes del despliegue (python maintenance.py schema migrate)
+MIGRATE_ON_STARTUP = os.getenv(
+    "MIGRATE_ON_STARTUP", "true" if os.getenv("APP_ENV") == "development" else "false"
+) == "true"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Esquema: una consulta de version, o las migraciones pendientes en desarrollo
+    if MIGRATE_ON_STARTUP:
+        for version, description in migrations.migrate(engine):
+            print(f"✅ Migracion {version} aplicada: {description}")
+    migrations.check_schema(engine)
+    metrics.check_settings()
+    os.makedirs(uploads.BUSINESS_UPLOAD_DIR, exist_ok=True)
+
+    # Configuracion efectiva de la base de datos (perfil de SQLite o pool)
+    settings = database.describe_settings()
+    print("✅ Base de datos: " + ", ".join(f"{name}={value}" for name, value in settings.items()))
+    yield
+
 
 # Crear app
 app = FastAPI(
     title="Getsemani Vivo API",
     description="API para la aplicacion movil del barrio Getsemani, Cartagena",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# =============================================================================
+# CONFIGURACION DE UPLOADS
+# =============================================================================
+
+# La carpeta se crea al iniciar (lifespan), no al importar
+app.mount("/uploads", uploads.ImmutableStaticFiles(directory=uploads.UPLOAD_DIR, check_dir=False), name="uploads")
+
+# Rechaza las imagenes demasiado grandes antes de leer el cuerpo del request.
+# Se registra antes que CORS para que sus respuestas 413 tambien lleven CORS.
+app.add_middleware(uploads.UploadSizeLimitMiddleware)
+
 # =============================================================================
 # CONFIGURACION DE CORS
 # =============================================================================
@@ -56,15 +103,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[pagination.NEXT_CURSOR_HEADER, database.PROFILE_HEADER],
 )
 
 # =============================================================================
-# CONFIGURACION DE UPLOADS
+# METRICAS
 # =============================================================================
 
-UPLOAD_DIR = "uploads"
-os.makedirs(f"{UPLOAD_DIR}/businesses", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+# Se registra al final para ser el middleware externo: mide tambien las
+# respuestas de CORS y del limite de subida
+if metrics.METRICS_ENABLED:
+    metrics.instrument_engine(engine, "primary")
+    if database.read_engine is not engine:
+        metrics.instrument_engine(database.read_engine, "replica")
+    if database.ASYNC_MODE:
+        metrics.instrument_engine(database.async_engine.sync_engine, "async")
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Perfilador de SQL (SQL_PROFILE=true, ver database.py)
+if database.SQL_PROFILE:
+    app.add_middleware(database.SQLProfilerMiddleware)
+
+# =============================================================================
+# POOL DE CONTRASENAS
+# =============================================================================
+
+@app.exception_handler(passwords.PasswordPoolSaturated)
+def password_pool_saturated_handler(request: Request, exc: passwords.PasswordPoolSaturated):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Servidor ocupado, intenta de nuevo en unos segundos"},
+        headers={"Retry-After": "1"}
+    )
 
 
 # =============================================================================
@@ -86,17 +156,30 @@ def health_check():
     return {"status": "ok", "message": "API funcionando correctamente"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics(request: Request):
+    """Metricas en formato Prometheus (ver metrics.py)"""
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if metrics.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {metrics.METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Token de metricas invalido")
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.post("/register", response_model=schemas.User, status_code=201, tags=["Autenticacion"])
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    # Asincrono: mientras bcrypt trabaja el request no ocupa un hilo del threadpool,
+    # solo las consultas corren ahi
+    db_user = await run_in_threadpool(crud.get_user_by_email, db, user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Este email ya esta registrado")
-    return crud.create_user(db=db, user=user, role="user")
+    hashed_password = await passwords.hash_password_async(user.password)
+    return await run_in_threadpool(crud.create_user, db, user, "user", hashed_password)
 
 
 @app.post("/login", response_model=schemas.Token, tags=["Autenticacion"])
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=401, detail="Email o contrasena incorrectos")
     if not user.is_active:
@@ -113,35 +196,101 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
 # ENDPOINTS PUBLICOS DE NEGOCIOS
 # =============================================================================
 
-@app.get("/businesses", response_model=List[schemas.BusinessSimple], tags=["Negocios - Publico"])
+# En modo asincrono (DATABASE_URL con aiosqlite/asyncpg) los endpoints marcados
+# con sync_route no se registran aqui: los atiende async_api.py con AsyncSession
+def sync_route(path: str, **kwargs):
+    if database.ASYNC_MODE:
+        return lambda func: func
+    return app.get(path, **kwargs)
+
+
+# Las respuestas que se guardan en catalog_cache se construyen desde la primaria:
+# leidas de la replica justo despues de una invalidacion, podrian guardar datos
+# atrasados durante todo el TTL para todos los clientes. Como la cache atiende
+# casi todos los requests, la primaria solo recibe los fallos. Sin cache, leen
+# de la replica como el resto del catalogo.
+get_catalog_db = get_db if cache.catalog_cache.enabled else get_read_db
+
+
+@sync_route("/businesses", response_model=List[schemas.BusinessSimple], tags=["Negocios - Publico"])
 def list_businesses(
+    request: Request,
     skip: int = 0,
     limit: int = 20,
     category: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_catalog_db)
+):
+    after = pagination.decode_cursor(cursor, pagination.ID_CURSOR)
+    
+    def build():
+        businesses = crud.get_businesses(db, skip=skip, limit=limit, category=category, only_approved=True, after=after)
+        next_cursor = pagination.next_cursor(businesses, limit, pagination.id_key)
+        headers = {pagination.NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        return cache.CachedResponse(fastjson.dump_list(schemas.BusinessSimple, businesses), headers)
+    
+    key = ("list", skip if after is None else None, limit, category, after)
+    return cache.cached_json(request, key, build)
+
+
+@app.get("/businesses/nearby", response_model=List[schemas.BusinessNearby], tags=["Negocios - Publico"])
+def list_nearby_businesses(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius: float = Query(500, gt=0, le=20000, description="Radio en metros"),
+    limit: int = Query(20, ge=1, le=100),
+    category: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db)
 ):
-    return crud.get_businesses(db, skip=skip, limit=limit, category=category, only_approved=True)
+    return fastjson.list_response(
+        schemas.BusinessNearby,
+        crud.get_nearby_businesses(db, lat, lng, radius, limit=limit, category=category)
+    )
 
 
-@app.get("/businesses/featured", response_model=List[schemas.BusinessSimple], tags=["Negocios - Publico"])
-def list_featured_businesses(db: Session = Depends(get_db)):
-    return crud.get_featured_businesses(db)
+@app.get("/businesses/search", response_model=List[schemas.BusinessSimple], tags=["Negocios - Publico"])
+def search_businesses(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    return fastjson.list_response(schemas.BusinessSimple, search.search_businesses(db, q, limit=limit))
 
 
-@app.get("/businesses/{business_id}", response_model=schemas.Business, tags=["Negocios - Publico"])
-def get_business(business_id: int, db: Session = Depends(get_db)):
-    business = crud.get_business(db, business_id)
-    if not business or business.status != "approved":
-        raise HTTPException(status_code=404, detail="Negocio no encontrado")
-    return business
+if database.ASYNC_MODE:
+    # Solo se importa en modo asincrono
+    import async_api
+    app.include_router(async_api.router)
 
 
-@app.get("/businesses/{business_id}/images", response_model=List[schemas.BusinessImage], tags=["Negocios - Publico"])
-def get_business_images_public(business_id: int, db: Session = Depends(get_db)):
-    business = crud.get_business(db, business_id)
-    if not business or business.status != "approved":
-        raise HTTPException(status_code=404, detail="Negocio no encontrado")
-    return crud.get_business_images(db, business_id)
+@sync_route("/businesses/featured", response_model=List[schemas.BusinessSimple], tags=["Negocios - Publico"])
+def list_featured_businesses(request: Request, db: Session = Depends(get_catalog_db)):
+    def build():
+        return cache.CachedResponse(fastjson.dump_list(schemas.BusinessSimple, crud.get_featured_businesses(db)))
+    
+    return cache.cached_json(request, ("featured",), build)
+
+
+@sync_route("/businesses/{business_id}", response_model=schemas.Business, tags=["Negocios - Publico"])
+def get_business(business_id: int, request: Request, db: Session = Depends(get_catalog_db)):
+    def build():
+        business = crud.get_business(db, business_id)
+        if not business or business.status != "approved":
+            raise HTTPException(status_code=404, detail="Negocio no encontrado")
+        return cache.CachedResponse(fastjson.dump(schemas.Business, business))
+    
+    return cache.cached_json(request, ("detail", business_id), build)
+
+
+@sync_route("/businesses/{business_id}/images", response_model=List[schemas.BusinessImage], tags=["Negocios - Publico"])
+def get_business_images_public(business_id: int, request: Request, db: Session = Depends(get_catalog_db)):
+    def build():
+        business = crud.get_business(db, business_id)
+        if not business or business.status != "approved":
+            raise HTTPException(status_code=404, detail="Negocio no encontrado")
+        return cache.CachedResponse(fastjson.dump_list(schemas.BusinessImage, crud.get_business_images(db, business_id)))
+    
+    return cache.cached_json(request, ("images", business_id), build)
 
 
 # =============================================================================
@@ -166,34 +315,27 @@ def update_my_profile(
 # ENDPOINTS DE MIS PUNTOS
 # =============================================================================
 
-@app.get("/my-points", response_model=schemas.UserPointsSummary, tags=["Mis Puntos"])
+@sync_route("/my-points", response_model=schemas.UserPointsSummary, tags=["Mis Puntos"])
 def get_my_points(
     current_user = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_read_db)
 ):
     return crud.get_user_points_summary(db, current_user.id)
 
 
-@app.get("/my-points/history", response_model=List[schemas.ConsumptionWithDetails], tags=["Mis Puntos"])
+@sync_route("/my-points/history", response_model=List[schemas.ConsumptionWithDetails], tags=["Mis Puntos"])
 def get_my_consumption_history(
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = Query(None),
     current_user = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_read_db)
 ):
-    consumptions = crud.get_user_consumptions(db, current_user.id, skip=skip, limit=limit)
-    result = []
-    for c in consumptions:
-        result.append({
-            "id": c.id,
-            "amount": c.amount,
-            "points_earned": c.points_earned,
-            "description": c.description,
-            "business_name": c.business.name,
-            "business_category": c.business.category,
-            "created_at": c.created_at
-        })
-    return result
+    after = pagination.decode_cursor(cursor, pagination.CREATED_AT_CURSOR)
+    consumptions = crud.get_user_consumption_history(db, current_user.id, skip=skip, limit=limit, after=after)
+    response = fastjson.list_response(schemas.ConsumptionWithDetails, consumptions)
+    pagination.set_next_cursor(response, consumptions, limit, pagination.created_at_key)
+    return response
 
 
 # =============================================================================
@@ -205,7 +347,7 @@ def list_my_businesses(
     current_user = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    return crud.get_businesses_by_owner(db, current_user.id)
+    return fastjson.list_response(schemas.Business, crud.get_businesses_by_owner(db, current_user.id, load=crud.LOAD_IMAGES))
 
 
 @app.post("/my-businesses", response_model=schemas.Business, status_code=201, tags=["Mis Negocios"])
@@ -254,7 +396,7 @@ def delete_my_business(
 # =============================================================================
 
 @app.post("/my-businesses/{business_id}/images", response_model=schemas.BusinessImage, tags=["Imagenes de Negocios"])
-async def upload_business_image(
+def upload_business_image(
     business_id: int,
     file: UploadFile = File(...),
     is_primary: bool = False,
@@ -267,24 +409,17 @@ async def upload_business_image(
     if business.owner_id != current_user.id and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="No tienes permiso")
     
-    allowed_types = ["image/jpeg", "image/png", "image/webp", "image/jpg"]
-    if file.content_type not in allowed_types:
-        raise HTTPException(status_code=400, detail="Tipo de archivo no permitido. Use JPG, PNG o WEBP")
-    
-    contents = await file.read()
-    if len(contents) > 5 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="La imagen no puede superar 5MB")
-    
-    extension = file.filename.split(".")[-1]
-    unique_filename = f"{uuid.uuid4()}.{extension}"
-    file_path = f"{UPLOAD_DIR}/businesses/{unique_filename}"
+    # Endpoint sincrono: la copia por bloques corre en el threadpool, no en el event loop
+    unique_filename = uploads.save_image(file.file)
     
-    with open(file_path, "wb") as f:
-        f.write(contents)
-    
-    url = f"/uploads/businesses/{unique_filename}"
+    url = uploads.public_url(unique_filename)
     db_image = crud.create_business_image(db, business_id, unique_filename, url, is_primary)
     
+    # Las variantes (thumb, card, full) se generan en segundo plano.
+    # images (y Pillow) se carga con la primera imagen, no al iniciar el servidor.
+    import images
+    images.schedule_variants(db_image.id, unique_filename)
+    
     return db_image
 
 
@@ -299,7 +434,7 @@ def get_my_business_images(
         raise HTTPException(status_code=404, detail="Negocio no encontrado")
     if business.owner_id != current_user.id and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="No tienes permiso")
-    return crud.get_business_images(db, business_id)
+    return fastjson.list_response(schemas.BusinessImage, crud.get_business_images(db, business_id))
 
 
 @app.delete("/my-businesses/{business_id}/images/{image_id}", response_model=schemas.MessageResponse, tags=["Imagenes de Negocios"])
@@ -319,10 +454,9 @@ def delete_business_image(
     if not image or image.business_id != business_id:
         raise HTTPException(status_code=404, detail="Imagen no encontrada")
     
-    file_path = f"{UPLOAD_DIR}/businesses/{image.filename}"
-    if os.path.exists(file_path):
-        os.remove(file_path)
-    
+    # Solo se borra la fila: el archivo puede estar compartido con otras imagenes
+    # (mismo contenido) o con una subida en curso. "maintenance.py images gc"
+    # borra los archivos que ya ninguna imagen usa.
     crud.delete_image(db, image_id)
     return {"message": "Imagen eliminada"}
 
@@ -378,60 +512,168 @@ def register_consumption(
         registered_by_id=current_user.id,
         description=consumption.description
     )
+    database.mark_recent_write(current_user.id, client.id)
     return db_consumption
 
 
+# Cierres de turno: muchos consumos en un solo request
+BULK_MAX_ROWS = 1000
+BULK_CSV_MAX_BYTES = 1024 * 1024
+
+
+def validate_bulk_row(record) -> object:
+    """
+    Una fila de un envio en lote: ConsumptionCreate si es valida, o un dict con
+    el error. El JSON y el CSV reportan igual las filas invalidas.
+    """
+    if not isinstance(record, dict):
+        return {"user_email": "", "error": "La fila debe ser un objeto con user_email y amount"}
+    try:
+        return schemas.ConsumptionCreate.model_validate(record)
+    except ValidationError as e:
+        user_email = record.get("user_email")
+        return {
+            "user_email": user_email if isinstance(user_email, str) else "",
+            "error": "; ".join(f"{error['loc'][0]}: {error['msg']}" if error["loc"] else error["msg"] for error in e.errors())
+        }
+
+
+def register_consumptions_bulk(db: Session, business_id: int, current_user, rows: list):
+    """
+    rows: (numero de fila, ConsumptionCreate o mensaje de error).
+    Registra las filas validas en una transaccion y devuelve el resultado de cada fila.
+    """
+    business = crud.get_business(db, business_id)
+    if not business:
+        raise HTTPException(status_code=404, detail="Negocio no encontrado")
+    if business.owner_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="No tienes permiso")
+    if business.status != "approved":
+        raise HTTPException(status_code=400, detail="El negocio no esta aprobado")
+    if not rows:
+        raise HTTPException(status_code=400, detail="No hay consumos para registrar")
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"Maximo {BULK_MAX_ROWS} consumos por envio")
+    
+    valid = [(row, entry) for row, entry in rows if isinstance(entry, schemas.ConsumptionCreate)]
+    created = crud.create_consumptions_bulk(
+        db, business, [entry for _, entry in valid], registered_by_id=current_user.id
+    )
+    database.mark_recent_write(current_user.id, *{r["user_id"] for r in created if "user_id" in r})
+    
+    results = {row: {"row": row, **result} for (row, _), result in zip(valid, created)}
+    for row, entry in rows:
+        if not isinstance(entry, schemas.ConsumptionCreate):
+            results[row] = {"row": row, **entry}
+    results = [results[row] for row, _ in rows]
+    
+    ok = [r for r in results if not r.get("error")]
+    return {
+        "created": len(ok),
+        "failed": len(results) - len(ok),
+        "total_points": sum(r["points_earned"] for r in ok),
+        "results": results
+    }
+
+
+@app.post(
+    "/my-businesses/{business_id}/consumptions/bulk",
+    response_model=schemas.ConsumptionBulkResponse,
+    tags=["Gestion de Puntos"],
+    # Las filas se validan una por una; la documentacion conserva el tipo de cada fila
+    openapi_extra={"requestBody": {"required": True, "content": {"application/json": {"schema": {
+        "type": "array", "items": {"$ref": "#/components/schemas/ConsumptionCreate"}
+    }}}}}
+)
+def register_consumptions_bulk_json(
+    business_id: int,
+    consumptions: List[Any] = Body(...),
+    current_user = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Registra una lista de consumos. Cada fila se valida por separado, como en
+    el CSV: las filas con error se reportan y no impiden registrar las demas.
+    """
+    rows = [(row, validate_bulk_row(record)) for row, record in enumerate(consumptions, start=1)]
+    return register_consumptions_bulk(db, business_id, current_user, rows)
+
+
+@app.post("/my-businesses/{business_id}/consumptions/bulk/csv", response_model=schemas.ConsumptionBulkResponse, tags=["Gestion de Puntos"])
+def register_consumptions_bulk_csv(
+    business_id: int,
+    file: UploadFile = File(...),
+    current_user = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Registra los consumos de un CSV con encabezado user_email,amount[,description].
+    Las filas con error se reportan y no impiden registrar las demas.
+    """
+    content = file.file.read(BULK_CSV_MAX_BYTES + 1)
+    if len(content) > BULK_CSV_MAX_BYTES:
+        raise HTTPException(status_code=400, detail="El archivo no puede superar 1MB")
+    try:
+        reader = csv.DictReader(io.StringIO(content.decode("utf-8-sig")))
+        fieldnames = reader.fieldnames or []
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="El archivo debe estar en UTF-8")
+    if not {"user_email", "amount"} <= {name.strip() for name in fieldnames}:
+        raise HTTPException(status_code=400, detail="El CSV debe tener las columnas user_email y amount")
+    
+    rows = []
+    for row, record in enumerate(reader, start=1):
+        record = {(key or "").strip(): (value or "").strip() for key, value in record.items() if isinstance(value, str)}
+        rows.append((row, validate_bulk_row({
+            "user_email": record.get("user_email", ""),
+            "amount": record.get("amount", ""),
+            "description": record.get("description") or None
+        })))
+    
+    return register_consumptions_bulk(db, business_id, current_user, rows)
+
+
 @app.get("/my-businesses/{business_id}/consumptions", response_model=List[schemas.ConsumptionWithUser], tags=["Gestion de Puntos"])
 def get_business_consumptions(
     business_id: int,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = Query(None),
     current_user = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_read_db)
 ):
     business = crud.get_business(db, business_id)
     if not business:
         raise HTTPException(status_code=404, detail="Negocio no encontrado")
     if business.owner_id != current_user.id and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="No tienes permiso")
-    consumptions = crud.get_business_consumptions(db, business_id, skip=skip, limit=limit)
-    result = []
-    for c in consumptions:
-        result.append({
-            "id": c.id,
-            "amount": c.amount,
-            "points_earned": c.points_earned,
-            "description": c.description,
-            "user_email": c.user.email,
-            "user_name": c.user.full_name,
-            "created_at": c.created_at
-        })
-    return result
-
-
-@app.get("/my-businesses/{business_id}/customers", tags=["Gestion de Puntos"])
+    after = pagination.decode_cursor(cursor, pagination.CREATED_AT_CURSOR)
+    consumptions = crud.get_business_consumption_history(db, business_id, skip=skip, limit=limit, after=after)
+    response = fastjson.list_response(schemas.ConsumptionWithUser, consumptions)
+    pagination.set_next_cursor(response, consumptions, limit, pagination.created_at_key)
+    return response
+
+
+@app.get("/my-businesses/{business_id}/customers", response_model=List[schemas.BusinessCustomer], tags=["Gestion de Puntos"])
 def get_business_customers(
     business_id: int,
+    skip: int = 0,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
     current_user = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_read_db)
 ):
+    """Clientes del negocio, de mayor a menor puntaje"""
     business = crud.get_business(db, business_id)
     if not business:
         raise HTTPException(status_code=404, detail="Negocio no encontrado")
     if business.owner_id != current_user.id and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="No tienes permiso")
-    customers = crud.get_business_customers(db, business_id)
-    return [
-        {
-            "user_id": c.id,
-            "email": c.email,
-            "full_name": c.full_name,
-            "total_points": c.total_points,
-            "total_spent": c.total_spent,
-            "visit_count": c.visit_count
-        }
-        for c in customers
-    ]
+    after = pagination.decode_cursor(cursor, pagination.CUSTOMER_CURSOR)
+    customers = crud.get_business_customers(db, business_id, skip=skip, limit=limit, after=after)
+    response = fastjson.list_response(schemas.BusinessCustomer, customers)
+    pagination.set_next_cursor(response, customers, limit, pagination.customer_key)
+    return response
 
 
 # =============================================================================
@@ -439,8 +681,17 @@ def get_business_customers(
 # =============================================================================
 
 @app.get("/admin/users", response_model=List[schemas.UserSimple], tags=["Admin - Usuarios"])
-def admin_list_users(skip: int = 0, limit: int = 100, current_user = Depends(require_admin), db: Session = Depends(get_db)):
-    return crud.get_users(db, skip=skip, limit=limit)
+def admin_list_users(
+    skip: int = 0, limit: int = 100,
+    cursor: Optional[str] = Query(None),
+    current_user = Depends(require_admin),
+    db: Session = Depends(get_user_read_db)
+):
+    after = pagination.decode_cursor(cursor, pagination.ID_CURSOR)
+    users = crud.get_users(db, skip=skip, limit=limit, after=after)
+    response = fastjson.list_response(schemas.UserSimple, users)
+    pagination.set_next_cursor(response, users, limit, pagination.id_key)
+    return response
 
 
 @app.get("/admin/users/{user_id}", response_model=schemas.User, tags=["Admin - Usuarios"])
@@ -477,6 +728,12 @@ def admin_activate_user(user_id: int, current_user = Depends(require_admin), db:
     return {"message": f"Usuario {user.email} activado"}
 
 
+@app.get("/admin/password-pool", tags=["Admin - Usuarios"])
+def admin_password_pool_stats(current_user = Depends(require_admin)):
+    """Estado del pool de bcrypt: trabajos en espera, rechazos y tiempos de espera vs. hash"""
+    return passwords.hasher.stats()
+
+
 # =============================================================================
 # ENDPOINTS DE ADMINISTRACION - NEGOCIOS
 # =============================================================================
@@ -486,15 +743,25 @@ def admin_list_businesses(
     skip: int = 0, limit: int = 100,
     status: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
     current_user = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_user_read_db)
 ):
-    return crud.get_businesses(db, skip=skip, limit=limit, status=status, category=category)
+    after = pagination.decode_cursor(cursor, pagination.ID_CURSOR)
+    businesses = crud.get_businesses(
+        db, skip=skip, limit=limit, status=status, category=category, after=after,
+        load=crud.LOAD_IMAGES_AND_OWNER
+    )
+    response = fastjson.list_response(schemas.BusinessWithOwner, businesses)
+    pagination.set_next_cursor(response, businesses, limit, pagination.id_key)
+    return response
 
 
 @app.get("/admin/businesses/pending", response_model=List[schemas.BusinessWithOwner], tags=["Admin - Negocios"])
-def admin_list_pending(current_user = Depends(require_admin), db: Session = Depends(get_db)):
-    return crud.get_businesses(db, status="pending")
+def admin_list_pending(current_user = Depends(require_admin), db: Session = Depends(get_user_read_db)):
+    return fastjson.list_response(
+        schemas.BusinessWithOwner, crud.get_businesses(db, status="pending", load=crud.LOAD_IMAGES_AND_OWNER)
+    )
 
 
 @app.put("/admin/businesses/{business_id}/status", response_model=schemas.Business, tags=["Admin - Negocios"])
@@ -519,4 +786,42 @@ def admin_delete_business(business_id: int, current_user = Depends(require_admin
     if not business:
         raise HTTPException(status_code=404, detail="Negocio no encontrado")
     crud.delete_business(db, business_id)
-    return {"message": f"Negocio '{business.name}' eliminado"}
\ No newline at end of file
+    return {"message": f"Negocio '{business.name}' eliminado"}
+
+
+# =============================================================================
+# ENDPOINTS DE ESTADISTICAS
+# =============================================================================
+
+@app.get("/my-businesses/{business_id}/stats", response_model=schemas.StatsReport, tags=["Estadisticas"])
+def get_business_stats(
+    business_id: int,
+    start: Optional[date] = Query(None, alias="from", description="Primer dia (por defecto, hace 30 dias)"),
+    end: Optional[date] = Query(None, alias="to", description="Ultimo dia, incluido (por defecto, hoy)"),
+    granularity: schemas.StatsGranularity = Query(schemas.StatsGranularity.DAY),
+    current_user = Depends(get_current_active_user),
+    db: Session = Depends(get_user_read_db)
+):
+    """Consumos, monto y puntos del negocio por dia, semana o mes"""
+    business = crud.get_business(db, business_id)
+    if not business:
+        raise HTTPException(status_code=404, detail="Negocio no encontrado")
+    if business.owner_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="No tienes permiso")
+    start, end = stats.resolve_range(start, end)
+    rows = crud.get_daily_stats(db, start, end, business_id=business_id)
+    return stats.build_report(rows, start, end, granularity, business_id=business_id)
+
+
+@app.get("/admin/stats", response_model=schemas.StatsReport, tags=["Estadisticas"])
+def admin_get_stats(
+    start: Optional[date] = Query(None, alias="from", description="Primer dia (por defecto, hace 30 dias)"),
+    end: Optional[date] = Query(None, alias="to", description="Ultimo dia, incluido (por defecto, hoy)"),
+    granularity: schemas.StatsGranularity = Query(schemas.StatsGranularity.DAY),
+    current_user = Depends(require_admin),
+    db: Session = Depends(get_user_read_db)
+):
+    """Consumos, monto y puntos de todos los negocios por dia, semana o mes"""
+    start, end = stats.resolve_range(start, end)
+    rows = crud.get_daily_stats(db, start, end)
+    return stats.build_report(rows, start, end, granularity)
@@ -0,0 +1,311 @@
+# maintenance.py
+# Tareas de mantenimiento de datos - Getsemani Vivo
+#
+# Uso:
+#   python maintenance.py points rebuild   # Recalcula los saldos de puntos desde los consumos
+#   python maintenance.py points verify    # Compara los saldos con los consumos (sale con 1 si hay diferencias)
+#   python maintenance.py stats rebuild    # Recalcula las estadisticas diarias de los negocios desde los consumos
+#   python maintenance.py schema migrate   # Aplica las migraciones pendientes (ver migrations.py)
+#   python maintenance.py schema version   # Muestra la version del esquema de la base
+#   python maintenance.py schema columns   # Agrega a las tablas existentes las columnas nuevas de models.py
+#   python maintenance.py schema indexes   # Crea los indices que falten en una base existente
+#   python maintenance.py geo rebuild      # Recalcula el geohash de los negocios
+#   python maintenance.py search rebuild   # Reconstruye el indice de busqueda de negocios
+#   python maintenance.py images backfill  # Genera las variantes (thumb, card, full) de las imagenes que no las tienen
+#   python maintenance.py images gc        # Borra los archivos subidos que ninguna imagen usa
+#   python maintenance.py check plans      # Falla si alguna consulta de crud.py recorre una tabla completa
+#   python maintenance.py check statements # Falla si un listado emite mas sentencias SQL con paginas mas grandes
+#   python maintenance.py check pages      # Falla si recorrer un listado por cursor pierde o repite filas
+
+import argparse
+import sys
+
+from database import SessionLocal, engine
+import crud
+import migrations
+
+
+# =============================================================================
+# SALDOS DE PUNTOS
+# =============================================================================
+
+def points_rebuild(args):
+    db = SessionLocal()
+    try:
+        result = crud.rebuild_points_balances(db)
+        print("✅ Saldos de puntos reconstruidos")
+        print(f"   Usuarios: {result['users']}")
+        print(f"   Usuario x negocio: {result['user_businesses']}")
+        return 0
+    finally:
+        db.close()
+
+
+def points_verify(args):
+    db = SessionLocal()
+    try:
+        mismatches = crud.verify_points_balances(db)
+        if not mismatches:
+            print("✅ Los saldos de puntos coinciden con los consumos")
+            return 0
+
+        print(f"⚠️  Se encontraron {len(mismatches)} diferencias:")
+        for m in mismatches[:args.show]:
+            scope = f"negocio {m['business_id']}" if m["business_id"] is not None else "total"
+            print(f"   Usuario {m['user_id']} ({scope}): esperado={m['expected']} actual={m['actual']}")
+        print("   Ejecuta 'python maintenance.py points rebuild' para corregirlos")
+        return 1
+    finally:
+        db.close()
+
+
+# =============================================================================
+# ESTADISTICAS
+# =============================================================================
+
+def stats_rebuild(args):
+    db = SessionLocal()
+    try:
+        result = crud.rebuild_daily_stats(db)
+        print("✅ Estadisticas diarias reconstruidas")
+        print(f"   Negocios: {result['businesses']}")
+        print(f"   Negocio x dia: {result['days']}")
+        return 0
+    finally:
+        db.close()
+
+
+# =============================================================================
+# ESQUEMA
+# =============================================================================
+
+def schema_migrate(args):
+    applied = migrations.migrate(engine)
+    for version, description in applied:
+        print(f"   + {version}: {description}")
+    print(f"✅ Esquema en la version {migrations.CURRENT_VERSION} ({len(applied)} migraciones aplicadas)")
+    return 0
+
+
+def schema_version(args):
+    version = migrations.get_version(engine)
+    print(f"   Version de la base: {version}")
+    print(f"   Version requerida:  {migrations.CURRENT_VERSION}")
+    if version < migrations.CURRENT_VERSION:
+        print("⚠️  Hay migraciones pendientes: python maintenance.py schema migrate")
+        return 1
+    print("✅ Esquema al dia")
+    return 0
+
+
+def schema_columns(args):
+    added = migrations.add_missing_columns(engine)
+    for name in added:
+        print(f"   + {name}")
+    print(f"✅ Columnas verificadas ({len(added)} agregadas)")
+    return 0
+
+
+def schema_indexes(args):
+    created = migrations.create_missing_indexes(engine)
+    for name in created:
+        print(f"   + {name}")
+    print(f"✅ Indices verificados ({len(created)} creados)")
+    return 0
+
+
+# =============================================================================
+# UBICACION
+# =============================================================================
+
+def geo_rebuild(args):
+    db = SessionLocal()
+    try:
+        updated = crud.rebuild_geohashes(db)
+        print(f"✅ Geohash recalculado ({updated} negocios actualizados)")
+        return 0
+    finally:
+        db.close()
+
+
+# =============================================================================
+# BUSQUEDA
+# =============================================================================
+
+def search_rebuild(args):
+    import search
+
+    db = SessionLocal()
+    try:
+        indexed = search.rebuild_index(db)
+        print(f"✅ Indice de busqueda reconstruido ({indexed} negocios)")
+        return 0
+    finally:
+        db.close()
+
+
+# =============================================================================
+# IMAGENES
+# =============================================================================
+
+def images_backfill(args):
+    import images
+
+    db = SessionLocal()
+    try:
+        pending = crud.get_images_for_variants(db, include_processed=args.force)
+    finally:
+        db.close()
+
+    if not pending:
+        print("✅ Todas las imagenes tienen variantes")
+        return 0
+
+    print(f"   Procesando {len(pending)} imagenes...")
+    results = list(images.executor.map(
+        lambda image: images.process_image(image.id, image.filename, reuse=not args.force), pending
+    ))
+    failed = results.count(False)
+    print(f"✅ Variantes generadas ({len(pending) - failed} imagenes)")
+    if failed:
+        print(f"⚠️  {failed} imagenes no se pudieron procesar (archivo faltante o danado)")
+        return 1
+    return 0
+
+
+def images_gc(args):
+    import uploads
+
+    db = SessionLocal()
+    try:
+        referenced = crud.get_image_filenames(db)
+    finally:
+        db.close()
+
+    # Las filas se leen antes de listar el disco: un archivo subido despues es
+    # mas nuevo que el margen y no se toca
+    removed = uploads.remove_unreferenced_files(referenced, args.grace_minutes * 60, dry_run=args.dry_run)
+    for name in removed:
+        print(f"   {name}")
+    action = "Se borrarian" if args.dry_run else "Borrados"
+    print(f"✅ {action} {len(removed)} archivos sin imagen ({len(referenced)} archivos en uso)")
+    return 0
+
+
+# =============================================================================
+# VERIFICACIONES DE CONSULTAS
+# =============================================================================
+
+def check_plans(args):
+    import query_checks
+
+    failures = query_checks.check_query_plans()
+    if not failures:
+        print(f"✅ {len(query_checks.PLAN_CHECKS)} consultas usan indices")
+        return 0
+
+    print(f"⚠️  {len(failures)} sentencias recorren tablas completas:")
+    for name, statement, tables in failures:
+        print(f"   {name}: SCAN {', '.join(tables)}")
+        print(f"      {' '.join(statement.split())}")
+    return 1
+
+
+def check_statements(args):
+    import query_checks
+
+    counts, failures = query_checks.check_statement_counts()
+    for name, by_size in counts.items():
+        detail = ", ".join(f"{size} filas: {n}" for size, n in by_size.items())
+        mark = "⚠️ " if name in failures else "✅"
+        print(f"{mark} {name} ({detail})")
+
+    if failures:
+        print(f"⚠️  {len(failures)} endpoints hacen una consulta extra por fila (N+1)")
+        return 1
+    return 0
+
+
+def check_pages(args):
+    import query_checks
+
+    totals, failures = query_checks.check_cursor_pages()
+    failed = {name for name, *_ in failures}
+    for name, total in totals.items():
+        mark = "⚠️ " if name in failed else "✅"
+        print(f"{mark} {name} ({total} filas, paginas de {', '.join(map(str, query_checks.PAGE_CHECK_SIZES))})")
+    for name, size, expected, walked in failures:
+        print(f"   {name} con paginas de {size}: {len(walked)} filas recorridas de {len(expected)}")
+
+    if failures:
+        print(f"⚠️  {len(failed)} listados pierden o repiten filas al paginar por cursor")
+        return 1
+    return 0
+
+
+# =============================================================================
+# LINEA DE COMANDOS
+# =============================================================================
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Tareas de mantenimiento de Getsemani Vivo")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    points = commands.add_parser("points", help="Saldos de puntos")
+    points_commands = points.add_subparsers(dest="action", required=True)
+    points_commands.add_parser("rebuild", help="Recalcula los saldos desde los consumos").set_defaults(func=points_rebuild)
+    verify = points_commands.add_parser("verify", help="Verifica los saldos contra los consumos")
+    verify.add_argument("--show", type=int, default=20, help="Numero maximo de diferencias a mostrar")
+    verify.set_defaults(func=points_verify)
+
+    stats_parser = commands.add_parser("stats", help="Estadisticas diarias de los negocios")
+    stats_commands = stats_parser.add_subparsers(dest="action", required=True)
+    stats_commands.add_parser("rebuild", help="Recalcula las estadisticas desde los consumos").set_defaults(func=stats_rebuild)
+
+    schema = commands.add_parser("schema", help="Esquema de la base de datos")
+    schema_commands = schema.add_subparsers(dest="action", required=True)
+    schema_commands.add_parser("migrate", help="Aplica las migraciones pendientes").set_defaults(func=schema_migrate)
+    schema_commands.add_parser("version", help="Muestra la version del esquema").set_defaults(func=schema_version)
+    schema_commands.add_parser("columns", help="Agrega las columnas que falten").set_defaults(func=schema_columns)
+    schema_commands.add_parser("indexes", help="Crea los indices que falten").set_defaults(func=schema_indexes)
+
+    geo_parser = commands.add_parser("geo", help="Ubicacion de los negocios")
+    geo_commands = geo_parser.add_subparsers(dest="action", required=True)
+    geo_commands.add_parser("rebuild", help="Recalcula el geohash de los negocios").set_defaults(func=geo_rebuild)
+
+    search_parser = commands.add_parser("search", help="Indice de busqueda de negocios")
+    search_commands = search_parser.add_subparsers(dest="action", required=True)
+    search_commands.add_parser("rebuild", help="Reconstruye el indice de busqueda").set_defaults(func=search_rebuild)
+
+    images_parser = commands.add_parser("images", help="Imagenes de negocios")
+    images_commands = images_parser.add_subparsers(dest="action", required=True)
+    backfill = images_commands.add_parser("backfill", help="Genera las variantes que falten")
+    backfill.add_argument("--force", action="store_true", help="Regenera tambien las imagenes que ya tienen variantes")
+    backfill.set_defaults(func=images_backfill)
+    gc = images_commands.add_parser("gc", help="Borra los archivos que ninguna imagen usa")
+    gc.add_argument("--grace-minutes", type=float, default=60,
+                    help="No borra archivos modificados hace menos de estos minutos (subidas en curso)")
+    gc.add_argument("--dry-run", action="store_true", help="Solo lista los archivos que se borrarian")
+    gc.set_defaults(func=images_gc)
+
+    check = commands.add_parser("check", help="Verificaciones de rendimiento")
+    check_commands = check.add_subparsers(dest="action", required=True)
+    check_commands.add_parser("plans", help="Revisa el EXPLAIN QUERY PLAN de las consultas").set_defaults(func=check_plans)
+    check_commands.add_parser("statements", help="Cuenta las sentencias SQL por endpoint de listado").set_defaults(func=check_statements)
+    check_commands.add_parser("pages", help="Recorre los listados con cursor pagina por pagina").set_defaults(func=check_pages)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    # Las verificaciones usan su propia base en memoria; los comandos de esquema migran ellos mismos
+    if args.command not in ("schema", "check"):
+        migrations.migrate(engine)
+
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
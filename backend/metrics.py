@@ -0,0 +1,295 @@
+# metrics.py
+# Metricas de operacion en formato Prometheus - Getsemani Vivo
+#
+# MetricsMiddleware mide cada request: conteo por ruta, metodo y codigo de
+# estado, histograma de latencia, requests en curso y las sentencias SQL que
+# ejecuto (cantidad y tiempo). La ruta es la plantilla ("/businesses/{business_id}"),
+# no la URL, para que el numero de series no crezca con los ids.
+#
+# Las sentencias se cuentan con los eventos before/after_cursor_execute del
+# motor (instrument_engine) y se suman al request en curso a traves de una
+# ContextVar, que FastAPI copia al hilo donde corre cada endpoint sincrono.
+#
+# El estado del pool de conexiones y del pool de bcrypt se lee al exponer las
+# metricas, no en cada request. En el camino de cada request solo hay sumas
+# bajo un lock; render() arma el texto cuando Prometheus lo pide en /metrics.
+#
+# Variables de entorno:
+#   METRICS_ENABLED   true = middleware y /metrics (por defecto false)
+#   METRICS_TOKEN     /metrics exige "Authorization: Bearer <token>". Obligatorio
+#                     con METRICS_ENABLED=true fuera de desarrollo (APP_ENV=development):
+#                     el servidor no arranca sin el (check_settings)
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+import passwords
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false") == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "getsemani_"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Requests que no coinciden con ninguna ruta (404, archivos de /uploads)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsTokenMissing(Exception):
+    """Metricas activas sin token fuera de desarrollo"""
+
+
+def check_settings() -> None:
+    """Lanza MetricsTokenMissing si /metrics quedaria publico fuera de desarrollo"""
+    if METRICS_ENABLED and not METRICS_TOKEN and os.getenv("APP_ENV") != "development":
+        raise MetricsTokenMissing(
+            "METRICS_ENABLED=true expone /metrics: define METRICS_TOKEN "
+            "(o usa APP_ENV=development para probar sin token)"
+        )
+
+
+# =============================================================================
+# TIPOS DE METRICA
+# =============================================================================
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = PREFIX + name
+        self.help_text = help_text
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple, object] = {}
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}" for labels, value in values
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *label_values, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(Metric):
+    """Conteos por cubeta (no acumulados), suma y total; se acumulan al exponer"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets: Tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *label_values) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((labels, (list(counts), total, count)) for labels, (counts, total, count) in self._values.items())
+        lines = self.header()
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(float(total))}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {count}")
+        return lines
+
+
+# =============================================================================
+# METRICAS
+# =============================================================================
+
+requests_total = Counter("http_requests_total", "Requests atendidos por ruta, metodo y codigo de estado",
+                         ("method", "route", "status"))
+request_duration = Histogram("http_request_duration_seconds", "Latencia de los requests por ruta",
+                             ("method", "route"))
+requests_in_flight = Gauge("http_requests_in_flight", "Requests en curso")
+request_statements = Histogram("http_request_sql_statements", "Sentencias SQL ejecutadas por request",
+                               ("method", "route"), STATEMENT_BUCKETS)
+request_sql_duration = Histogram("http_request_sql_duration_seconds", "Tiempo en sentencias SQL por request",
+                                 ("method", "route"))
+statements_total = Counter("db_statements_total", "Sentencias SQL ejecutadas (con y sin request)", ("engine",))
+statement_seconds = Counter("db_statement_seconds_total", "Tiempo total en sentencias SQL", ("engine",))
+pool_checkouts = Counter("db_pool_checkouts_total", "Conexiones tomadas del pool", ("engine",))
+pool_connects = Counter("db_pool_connections_created_total", "Conexiones nuevas abiertas por el pool", ("engine",))
+
+METRICS = [requests_total, request_duration, requests_in_flight, request_statements, request_sql_duration,
+           statements_total, statement_seconds, pool_checkouts, pool_connects]
+
+# (etiqueta, motor) de los motores instrumentados, para leer el pool al exponer
+_engines: List[Tuple[str, object]] = []
+
+# [sentencias, segundos] del request en curso; None fuera de un request
+_request_sql: ContextVar[Optional[list]] = ContextVar("request_sql", default=None)
+
+
+# =============================================================================
+# SENTENCIAS SQL Y POOL
+# =============================================================================
+
+def instrument_engine(target, label: str) -> None:
+    """Cuenta las sentencias, su tiempo y las conexiones de un motor sincrono"""
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started
+        statements_total.inc(label)
+        statement_seconds.inc(label, amount=elapsed)
+        current = _request_sql.get()
+        if current is not None:
+            current[0] += 1
+            current[1] += elapsed
+
+    event.listen(target, "before_cursor_execute", before_cursor_execute)
+    event.listen(target, "after_cursor_execute", after_cursor_execute)
+    event.listen(target, "checkout", lambda *args: pool_checkouts.inc(label))
+    event.listen(target, "connect", lambda *args: pool_connects.inc(label))
+    _engines.append((label, target))
+
+
+def _pool_lines() -> List[str]:
+    gauges = (
+        ("db_pool_size", "Conexiones permanentes del pool", lambda pool: pool.size()),
+        ("db_pool_checked_out", "Conexiones en uso", lambda pool: pool.checkedout()),
+        ("db_pool_checked_in", "Conexiones libres en el pool", lambda pool: pool.checkedin()),
+        ("db_pool_overflow", "Conexiones por encima de pool_size (negativo: aun no se abren todas)",
+         lambda pool: pool.overflow()),
+    )
+    lines = []
+    for name, help_text, read in gauges:
+        lines += [f"# HELP {PREFIX}{name} {help_text}", f"# TYPE {PREFIX}{name} gauge"]
+        for label, target in _engines:
+            if isinstance(target.pool, QueuePool):
+                lines.append(f'{PREFIX}{name}{{engine="{label}"}} {read(target.pool)}')
+    return lines
+
+
+def _password_pool_lines() -> List[str]:
+    stats = passwords.hasher.stats()
+    metrics = (
+        ("password_pool_wait_seconds", "summary", "Espera de los hashes de bcrypt antes de ejecutarse",
+         [("_sum", stats["wait_seconds_total"]), ("_count", stats["completed"])]),
+        ("password_pool_hash_seconds", "summary", "Tiempo de calculo de los hashes de bcrypt",
+         [("_sum", stats["hash_seconds_total"]), ("_count", stats["completed"])]),
+        ("password_pool_max_wait_seconds", "gauge", "Mayor espera observada",
+         [("", stats["max_wait_ms"] / 1000)]),
+        ("password_pool_pending", "gauge", "Hashes en ejecucion o en espera", [("", stats["pending"])]),
+        ("password_pool_workers", "gauge", "Hilos del pool de bcrypt", [("", stats["workers"])]),
+        ("password_pool_rejected_total", "counter", "Hashes rechazados con 503 por pool lleno",
+         [("", stats["rejected"])]),
+    )
+    lines = []
+    for name, kind, help_text, samples in metrics:
+        lines += [f"# HELP {PREFIX}{name} {help_text}", f"# TYPE {PREFIX}{name} {kind}"]
+        lines += [f"{PREFIX}{name}{suffix} {_format_value(value)}" for suffix, value in samples]
+    return lines
+
+
+COLLECTORS: List[Callable[[], Iterable[str]]] = [_pool_lines, _password_pool_lines]
+
+
+def render() -> str:
+    """Todas las metricas en el formato de texto de Prometheus"""
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    for collector in COLLECTORS:
+        lines += collector()
+    return "\n".join(lines) + "\n"
+
+
+# =============================================================================
+# MIDDLEWARE
+# =============================================================================
+
+class MetricsMiddleware:
+    """Mide cada request HTTP: latencia, codigo de estado y sentencias SQL"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        sql = [0, 0.0]
+        token = _request_sql.set(sql)
+        requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            requests_in_flight.dec()
+            _request_sql.reset(token)
+
+            # El router de FastAPI deja la ruta que atendio el request en el scope
+            route = scope.get("route")
+            path = getattr(route, "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            requests_total.inc(method, path, str(status[0]))
+            request_duration.observe(elapsed, method, path)
+            request_statements.observe(sql[0], method, path)
+            request_sql_duration.observe(sql[1], method, path)
@@ -0,0 +1,156 @@
+# migrations.py
+# Migraciones versionadas del esquema - Getsemani Vivo
+#
+# Cada migracion tiene un numero de version y la tabla schema_version guarda
+# las que ya se aplicaron. Al iniciar, el servidor no crea ni modifica tablas:
+# solo compara la version de la base con CURRENT_VERSION (una consulta) y se
+# niega a arrancar si faltan migraciones. Se aplican con:
+#   python maintenance.py schema migrate
+#
+# En desarrollo (APP_ENV=development) o con MIGRATE_ON_STARTUP=true, el
+# servidor las aplica al iniciar.
+#
+# Las migraciones 1 a 4 llevan al esquema actual cualquier base creada antes
+# de este modulo: crean las tablas, columnas e indices que falten y recalculan
+# los datos derivados. Las migraciones nuevas se agregan al final de MIGRATIONS
+# con el siguiente numero. Deben poder ejecutarse sobre una base que ya tiene
+# el cambio, porque en una base nueva la migracion 1 crea las tablas tal como
+# estan hoy en models.py.
+
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select
+from sqlalchemy.orm import Session
+
+import models
+import search  # registra la creacion de la tabla FTS5 en create_all
+
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+class SchemaOutdated(Exception):
+    """La base de datos tiene migraciones pendientes"""
+
+
+# =============================================================================
+# MIGRACIONES
+# =============================================================================
+
+def create_tables(engine) -> None:
+    models.Base.metadata.create_all(bind=engine)
+
+
+def add_missing_columns(engine) -> List[str]:
+    """Agrega las columnas de models.py que falten (create_all no modifica tablas existentes)"""
+    inspector = inspect(engine)
+    added = []
+    with engine.begin() as conn:
+        for table in models.Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    # Las columnas agregadas despues de crear una tabla son opcionales (nullable)
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}')
+                    added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def create_missing_indexes(engine) -> List[str]:
+    """Crea los indices de models.py que falten (create_all solo los crea en tablas nuevas)"""
+    inspector = inspect(engine)
+    created = []
+    for table in models.Base.metadata.sorted_tables:
+        existing = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+                created.append(index.name)
+    return created
+
+
+def rebuild_derived_data(engine) -> None:
+    """Saldos, geohash, indice de busqueda y estadisticas de las bases anteriores a esas tablas"""
+    import crud
+
+    db = Session(bind=engine)
+    try:
+        crud.rebuild_points_balances(db)
+        crud.rebuild_geohashes(db)
+        search.rebuild_index(db)
+        crud.rebuild_daily_stats(db)
+    finally:
+        db.close()
+
+
+def normalize_consumption_dates(engine) -> None:
+    """
+    En SQLite las fechas son texto: las de CURRENT_TIMESTAMP ("2026-01-01 12:00:00")
+    se pasan al formato con microsegundos que escribe SQLAlchemy, para que el
+    orden del texto sea el de las fechas y los cursores las comparen bien.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "UPDATE consumptions SET created_at = strftime('%Y-%m-%d %H:%M:%f', created_at) || '000' "
+            "WHERE created_at IS NOT NULL AND length(created_at) <> 26"
+        )
+
+
+# (version, descripcion, funcion que recibe el motor)
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "Tablas del esquema", create_tables),
+    (2, "Columnas nuevas en tablas existentes", add_missing_columns),
+    (3, "Indices de consulta", create_missing_indexes),
+    (4, "Saldos de puntos, geohash, indice de busqueda y estadisticas diarias", rebuild_derived_data),
+    (5, "Fechas de consumos con microsegundos", normalize_consumption_dates),
+]
+
+CURRENT_VERSION = MIGRATIONS[-1][0]
+
+
+# =============================================================================
+# APLICACION Y VERIFICACION
+# =============================================================================
+
+def get_version(engine) -> int:
+    """Version del esquema de la base (0 si nunca se migro)"""
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(schema_version.name):
+            return 0
+        return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def migrate(engine) -> List[Tuple[int, str]]:
+    """Aplica en orden las migraciones pendientes y devuelve las aplicadas"""
+    schema_version.create(bind=engine, checkfirst=True)
+    current = get_version(engine)
+
+    applied = []
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        step(engine)
+        with engine.begin() as conn:
+            conn.execute(schema_version.insert().values(version=version, description=description))
+        applied.append((version, description))
+    return applied
+
+
+def check_schema(engine) -> int:
+    """Devuelve la version del esquema o lanza SchemaOutdated si hay migraciones pendientes"""
+    version = get_version(engine)
+    if version < CURRENT_VERSION:
+        raise SchemaOutdated(
+            f"La base de datos esta en la version {version} del esquema y se requiere la {CURRENT_VERSION}. "
+            "Ejecuta: python maintenance.py schema migrate"
+        )
+    return version
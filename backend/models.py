@@ -1,14 +1,19 @@
 # models.py
 # Modelos SQLAlchemy - Getsemani Vivo
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Float, Text, ForeignKey, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from datetime import datetime, timezone
 from enum import Enum
 
 from database import Base
 
 
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 # =============================================================================
 # ENUMERACIONES
 # =============================================================================
@@ -45,6 +50,9 @@ class BusinessStatus(str, Enum):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_role", "role"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -67,6 +75,13 @@ class User(Base):
 
 class Business(Base):
     __tablename__ = "businesses"
+    __table_args__ = (
+        # Listados publicos: siempre filtran por status
+        Index("ix_businesses_status_category", "status", "category"),
+        Index("ix_businesses_status_featured", "status", "is_featured"),
+        Index("ix_businesses_owner_id", "owner_id"),
+        Index("ix_businesses_status_geohash", "status", "geohash"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
@@ -85,6 +100,7 @@ class Business(Base):
     address = Column(String(200), nullable=False)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    geohash = Column(String(12), nullable=True)  # Se calcula desde latitude/longitude
     
     # Horarios
     schedule_monday = Column(String(50), nullable=True)
@@ -119,10 +135,15 @@ class Business(Base):
 
 class BusinessImage(Base):
     __tablename__ = "business_images"
+    __table_args__ = (
+        Index("ix_business_images_business_order", "business_id", "order"),
+        # Referencias a un archivo compartido (mismo contenido)
+        Index("ix_business_images_filename", "filename"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
-    # Nombre del archivo guardado
+    # Nombre del archivo guardado (hash del contenido; puede repetirse entre imagenes)
     filename = Column(String(255), nullable=False)
     
     # URL relativa para acceder a la imagen
@@ -134,6 +155,9 @@ class BusinessImage(Base):
     # Orden de la imagen en la galeria
     order = Column(Integer, default=0)
     
+    # Tamanos redimensionados (thumb, card, full) con sus URLs JPG y WebP; ver images.py
+    variants = Column(JSON(none_as_null=True), nullable=True)
+    
     # Relacion con el negocio
     business_id = Column(Integer, ForeignKey("businesses.id"), nullable=False)
     business = relationship("Business", back_populates="images")
@@ -148,6 +172,11 @@ class BusinessImage(Base):
 
 class Consumption(Base):
     __tablename__ = "consumptions"
+    __table_args__ = (
+        # Historiales: filtran por usuario o negocio y ordenan por fecha
+        Index("ix_consumptions_user_created", "user_id", "created_at"),
+        Index("ix_consumptions_business_created", "business_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
@@ -170,5 +199,69 @@ class Consumption(Base):
     # Quien registro el consumo
     registered_by_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
+    # Fecha. Se asigna en Python (UTC, con microsegundos) y no solo con el
+    # server_default: en SQLite CURRENT_TIMESTAMP se guarda sin microsegundos y
+    # el texto no se ordena igual que las fechas que escribe SQLAlchemy. Los
+    # historiales paginan por esta columna (pagination.CREATED_AT_CURSOR).
+    created_at = Column(DateTime(timezone=True), default=utc_now, server_default=func.now())
+
+
+# =============================================================================
+# MODELOS DE SALDO DE PUNTOS
+# =============================================================================
+
+class UserPointsBalance(Base):
+    """Saldo total de puntos de un usuario, mantenido en cada consumo"""
+    __tablename__ = "user_points_balances"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    
+    # Totales acumulados
+    total_points = Column(Integer, default=0, nullable=False)
+    total_spent = Column(Float, default=0, nullable=False)
+    visit_count = Column(Integer, default=0, nullable=False)
+    businesses_visited = Column(Integer, default=0, nullable=False)
+    
+    # Fecha
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class UserBusinessPoints(Base):
+    """Saldo de puntos de un usuario en un negocio, mantenido en cada consumo"""
+    __tablename__ = "user_business_points"
+    __table_args__ = (
+        # Ranking de clientes de un negocio: se lee en orden inverso (mas puntos primero)
+        Index("ix_user_business_points_ranking", "business_id", "total_points", "user_id"),
+    )
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    business_id = Column(Integer, ForeignKey("businesses.id"), primary_key=True)
+    
+    # Totales acumulados
+    total_points = Column(Integer, default=0, nullable=False)
+    total_spent = Column(Float, default=0, nullable=False)
+    visit_count = Column(Integer, default=0, nullable=False)
+    
     # Fecha
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+# =============================================================================
+# MODELO DE ESTADISTICAS DIARIAS
+# =============================================================================
+
+class BusinessDailyStats(Base):
+    """Totales de consumos de un negocio en un dia (hora local), mantenidos en cada consumo"""
+    __tablename__ = "business_daily_stats"
+    __table_args__ = (
+        # Reporte de toda la plataforma: rango de dias sin filtrar por negocio
+        Index("ix_business_daily_stats_day", "day"),
+    )
+    
+    business_id = Column(Integer, ForeignKey("businesses.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    
+    # Totales del dia
+    consumption_count = Column(Integer, default=0, nullable=False)
+    total_amount = Column(Float, default=0, nullable=False)
+    total_points = Column(Integer, default=0, nullable=False)
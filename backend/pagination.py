@@ -0,0 +1,101 @@
+# pagination.py
+# Paginacion por cursor (keyset) - Getsemani Vivo
+#
+# Los listados devuelven en la cabecera X-Next-Cursor un cursor opaco con la
+# clave de orden del ultimo elemento. Enviarlo en ?cursor= devuelve la pagina
+# siguiente sin recorrer las filas anteriores. Si no se envia cursor, se sigue
+# usando skip/limit como antes.
+#
+# Cada tipo de cursor es una tupla de funciones que convierten los valores
+# del JSON a los tipos de la clave de orden (las fechas viajan en ISO 8601 y
+# se comparan como datetime, no como texto).
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Convierte la clave de orden de un elemento en un cursor opaco"""
+    raw = json.dumps(
+        [value.isoformat() if isinstance(value, datetime) else value for value in values],
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def parse_int(value: Any) -> int:
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise TypeError("se esperaba un entero")
+    return value
+
+
+def parse_datetime(value: Any) -> datetime:
+    if not isinstance(value, str):
+        raise TypeError("se esperaba una fecha ISO 8601")
+    return datetime.fromisoformat(value)
+
+
+def decode_cursor(cursor: Optional[str], parsers: Tuple[Callable[[Any], Any], ...]) -> Optional[tuple]:
+    """
+    Decodifica un cursor recibido en la query con un parser por valor.
+    Devuelve None si no hay cursor y lanza 400 si el cursor no es valido.
+    """
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(parsers):
+            raise ValueError("cursor con otra forma")
+        return tuple(parse(value) for parse, value in zip(parsers, values))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor invalido")
+
+
+def next_cursor(items: list, limit: int, key: Callable) -> Optional[str]:
+    """Cursor de la pagina siguiente, o None si la pagina no esta llena"""
+    if items and len(items) >= limit:
+        return encode_cursor(key(items[-1]))
+    return None
+
+
+def set_next_cursor(response: Response, items: list, limit: int, key: Callable) -> None:
+    """Agrega la cabecera X-Next-Cursor si la pagina esta llena"""
+    cursor = next_cursor(items, limit, key)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+
+
+# =============================================================================
+# CLAVES DE ORDEN
+# =============================================================================
+
+# Usuarios y negocios: por id ascendente
+ID_CURSOR = (parse_int,)
+
+
+def id_key(item):
+    return (item.id,)
+
+
+# Consumos: por fecha descendente y luego id descendente
+CREATED_AT_CURSOR = (parse_datetime, parse_int)
+
+
+def created_at_key(item):
+    return (item.created_at, item.id)
+
+
+# Clientes de un negocio: por puntos descendente y luego id de usuario descendente
+CUSTOMER_CURSOR = (parse_int, parse_int)
+
+
+def customer_key(item):
+    return (item.total_points, item.user_id)
@@ -0,0 +1,150 @@
+# passwords.py
+# Hash y verificacion de contrasenas en un pool dedicado - Getsemani Vivo
+#
+# bcrypt es lento a proposito (cientos de milisegundos por operacion). Para que
+# una rafaga de logins no ocupe los hilos compartidos de FastAPI, los hashes se
+# calculan en un pool de hilos propio con un limite de trabajos en espera. Si el
+# pool esta lleno se lanza PasswordPoolSaturated y la API responde 503 de
+# inmediato en lugar de encolar sin limite.
+#
+# Variables de entorno:
+#   PASSWORD_POOL_WORKERS   hilos que calculan hashes (por defecto, numero de CPUs)
+#   PASSWORD_POOL_QUEUE     trabajos que pueden esperar ademas de los que se ejecutan (por defecto 32)
+#   PASSWORD_POOL_TIMEOUT   segundos maximos esperando un resultado (por defecto 10)
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from passlib.context import CryptContext
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class PasswordPoolSaturated(Exception):
+    """El pool de contrasenas tiene todos sus lugares ocupados"""
+
+
+class PasswordHasher:
+    """Pool acotado para bcrypt con estadisticas de espera y de tiempo de hash"""
+
+    def __init__(self, workers: int, max_queue: int, timeout: float):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        # Un lugar por trabajo en ejecucion o en espera
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+        self._hash_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def _submit(self, func, *args) -> Future:
+        """Encola el trabajo si hay lugar; el lugar se libera cuando termina"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PasswordPoolSaturated()
+
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self._pending += 1
+
+        def task():
+            started_at = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                finished_at = time.perf_counter()
+                wait = started_at - submitted_at
+                with self._lock:
+                    self._pending -= 1
+                    self._completed += 1
+                    self._wait_seconds += wait
+                    self._hash_seconds += finished_at - started_at
+                    self._max_wait_seconds = max(self._max_wait_seconds, wait)
+                self._slots.release()
+
+        return self._executor.submit(task)
+
+    def _run(self, func, *args):
+        """Espera el resultado bloqueando el hilo actual (scripts y endpoints sincronos)"""
+        try:
+            return self._submit(func, *args).result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # El trabajo termina en segundo plano y libera su lugar
+            raise PasswordPoolSaturated()
+
+    async def _run_async(self, func, *args):
+        """
+        Espera el resultado sin ocupar un hilo: los endpoints de login y
+        registro no toman hilos del threadpool compartido de FastAPI mientras
+        bcrypt trabaja o esta en cola.
+        """
+        future = asyncio.wrap_future(self._submit(func, *args))
+        try:
+            # shield: al vencer el plazo el trabajo no se cancela y libera su lugar al terminar
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise PasswordPoolSaturated()
+
+    def hash(self, password: str) -> str:
+        return self._run(pwd_context.hash, password)
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return self._run(pwd_context.verify, password, hashed_password)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run_async(pwd_context.hash, password)
+
+    async def verify_async(self, password: str, hashed_password: str) -> bool:
+        return await self._run_async(pwd_context.verify, password, hashed_password)
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self._completed
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "pending": self._pending,
+                "completed": completed,
+                "rejected": self._rejected,
+                "wait_seconds_total": self._wait_seconds,
+                "hash_seconds_total": self._hash_seconds,
+                "avg_wait_ms": (self._wait_seconds / completed * 1000) if completed else 0.0,
+                "avg_hash_ms": (self._hash_seconds / completed * 1000) if completed else 0.0,
+                "max_wait_ms": self._max_wait_seconds * 1000
+            }
+
+
+hasher = PasswordHasher(
+    workers=int(os.getenv("PASSWORD_POOL_WORKERS", str(os.cpu_count() or 2))),
+    max_queue=int(os.getenv("PASSWORD_POOL_QUEUE", "32")),
+    timeout=float(os.getenv("PASSWORD_POOL_TIMEOUT", "10"))
+)
+
+
+def hash_password(password: str) -> str:
+    """Convierte una contrasena a hash seguro usando el pool"""
+    return hasher.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verifica una contrasena contra su hash usando el pool"""
+    return hasher.verify(plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    """Como hash_password, sin bloquear un hilo mientras espera"""
+    return await hasher.hash_async(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Como verify_password, sin bloquear un hilo mientras espera"""
+    return await hasher.verify_async(plain_password, hashed_password)
@@ -0,0 +1,397 @@
+# query_checks.py
+# Verificaciones de rendimiento de las consultas - Getsemani Vivo
+#
+# Ejecuta las funciones de crud.py contra una base SQLite en memoria, captura
+# cada sentencia SQL que emiten y revisa su EXPLAIN QUERY PLAN. Una consulta
+# que recorre una tabla completa (SCAN) en lugar de usar un indice se reporta
+# como fallo, salvo en los listados sin filtro donde es lo esperado.
+#
+# Tambien cuenta las sentencias que emite cada endpoint de listado con
+# paginas de distinto tamano: si el numero crece con la pagina hay cargas
+# perezosas por fila (N+1).
+#
+# Y recorre todas las paginas de los listados con cursor sobre datos con
+# claves de orden repetidas (consumos con la misma fecha, clientes con los
+# mismos puntos): ninguna fila debe perderse ni repetirse.
+#
+# Uso:
+#   python maintenance.py check plans
+#   python maintenance.py check statements
+#   python maintenance.py check pages
+
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models
+import schemas
+import crud
+import geo
+import search
+import fastjson
+import pagination
+
+
+# =============================================================================
+# UTILIDADES
+# =============================================================================
+
+def build_check_engine():
+    """Crea una base SQLite en memoria con el esquema actual"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    models.Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@contextmanager
+def capture_statements(engine):
+    """Registra las sentencias SQL ejecutadas dentro del bloque"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def seed_check_data(db):
+    """Crea un registro de cada tipo para que las funciones tengan datos con que trabajar"""
+    admin = models.User(email="admin@check.local", hashed_password="x", role="admin")
+    owner = models.User(email="owner@check.local", hashed_password="x", role="business")
+    client = models.User(email="client@check.local", hashed_password="x", role="user")
+    db.add_all([admin, owner, client])
+    db.flush()
+
+    business = models.Business(
+        name="Negocio de prueba",
+        address="Calle del Guerrero",
+        category="bar",
+        status="approved",
+        is_featured=True,
+        latitude=10.4215,
+        longitude=-75.5465,
+        geohash=geo.encode_geohash(10.4215, -75.5465),
+        owner_id=owner.id
+    )
+    db.add(business)
+    db.flush()
+    search.index_business(db, business)
+
+    db.add(models.BusinessImage(business_id=business.id, filename="check.jpg", url="/uploads/businesses/check.jpg"))
+    db.commit()
+
+    consumption = crud.create_consumption(db, client.id, business.id, 50000, owner.id)
+
+    return {
+        "admin": admin.id,
+        "owner": owner.id,
+        "client": client.id,
+        "business": business.id,
+        "image": db.query(models.BusinessImage).first().id,
+        "consumption_after": (consumption.created_at, consumption.id)
+    }
+
+
+def full_scans(db, statement, parameters):
+    """Devuelve las tablas que el plan de la sentencia recorre completas"""
+    plan = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    tables = []
+    for row in plan:
+        detail = row[-1]
+        # "SCAN tabla" sin indice; "SCAN tabla USING INDEX" tambien recorre todo el indice.
+        # Las tablas virtuales (FTS5) resuelven la busqueda con su propio indice.
+        if (
+            detail.startswith("SCAN ")
+            and "USING INTEGER PRIMARY KEY" not in detail
+            and "VIRTUAL TABLE" not in detail
+        ):
+            tables.append(detail.split()[1])
+    return tables
+
+
+# =============================================================================
+# CONSULTAS A VERIFICAR
+# =============================================================================
+
+# (nombre, funcion que ejecuta la consulta, tablas que pueden recorrerse completas)
+PLAN_CHECKS = [
+    ("get_user", lambda db, ids: crud.get_user(db, ids["client"]), ()),
+    ("get_user_by_email", lambda db, ids: crud.get_user_by_email(db, "client@check.local"), ()),
+    ("get_users", lambda db, ids: crud.get_users(db), ("users",)),
+    ("get_users (cursor)", lambda db, ids: crud.get_users(db, after=(ids["client"],)), ()),
+    ("get_users_by_role", lambda db, ids: crud.get_users_by_role(db, "business"), ()),
+    ("get_business", lambda db, ids: crud.get_business(db, ids["business"]), ()),
+    ("get_businesses (publico)", lambda db, ids: crud.get_businesses(db, only_approved=True), ()),
+    ("get_businesses (publico, categoria)", lambda db, ids: crud.get_businesses(db, category="bar", only_approved=True), ()),
+    ("get_businesses (publico, cursor)", lambda db, ids: crud.get_businesses(db, only_approved=True, after=(ids["business"],)), ()),
+    ("get_businesses (pendientes)", lambda db, ids: crud.get_businesses(db, status="pending"), ()),
+    ("get_businesses (admin, sin filtro)", lambda db, ids: crud.get_businesses(db), ("businesses",)),
+    ("get_businesses_by_owner", lambda db, ids: crud.get_businesses_by_owner(db, ids["owner"]), ()),
+    ("get_businesses_by_owner (con imagenes)", lambda db, ids: crud.get_businesses_by_owner(db, ids["owner"], load=crud.LOAD_IMAGES), ()),
+    ("get_businesses (pendientes, con imagenes y dueno)", lambda db, ids: crud.get_businesses(db, status="pending", load=crud.LOAD_IMAGES_AND_OWNER), ()),
+    ("get_featured_businesses", lambda db, ids: crud.get_featured_businesses(db), ()),
+    ("get_nearby_businesses", lambda db, ids: crud.get_nearby_businesses(db, 10.4220, -75.5460, 500), ()),
+    ("search_businesses", lambda db, ids: search.search_businesses(db, "negocio prueba"), ()),
+    ("get_business_images", lambda db, ids: crud.get_business_images(db, ids["business"]), ()),
+    ("create_business_image", lambda db, ids: crud.create_business_image(db, ids["business"], "new.jpg", "/uploads/businesses/new.jpg", True), ()),
+    ("set_primary_image", lambda db, ids: crud.set_primary_image(db, ids["image"]), ()),
+    ("get_variants_for_filename", lambda db, ids: crud.get_variants_for_filename(db, "new.jpg"), ()),
+    ("create_consumption", lambda db, ids: crud.create_consumption(db, ids["client"], ids["business"], 20000, ids["owner"]), ()),
+    ("get_user_consumptions", lambda db, ids: crud.get_user_consumptions(db, ids["client"]), ()),
+    ("get_user_consumptions (cursor)", lambda db, ids: crud.get_user_consumptions(db, ids["client"], after=ids["consumption_after"]), ()),
+    ("get_business_consumptions", lambda db, ids: crud.get_business_consumptions(db, ids["business"]), ()),
+    ("get_business_consumptions (cursor)", lambda db, ids: crud.get_business_consumptions(db, ids["business"], after=ids["consumption_after"]), ()),
+    ("get_user_consumption_history", lambda db, ids: crud.get_user_consumption_history(db, ids["client"]), ()),
+    ("get_business_consumption_history", lambda db, ids: crud.get_business_consumption_history(db, ids["business"], after=ids["consumption_after"]), ()),
+    ("get_user_points_summary", lambda db, ids: crud.get_user_points_summary(db, ids["client"]), ()),
+    ("get_business_customers", lambda db, ids: crud.get_business_customers(db, ids["business"]), ()),
+    ("get_business_customers (cursor)", lambda db, ids: crud.get_business_customers(db, ids["business"], after=(1, ids["client"])), ()),
+    ("get_daily_stats (negocio)", lambda db, ids: crud.get_daily_stats(db, date(2020, 1, 1), date(2030, 1, 1), ids["business"]), ()),
+    ("get_daily_stats (plataforma)", lambda db, ids: crud.get_daily_stats(db, date(2020, 1, 1), date(2030, 1, 1)), ()),
+]
+
+
+def check_query_plans():
+    """
+    Ejecuta cada consulta de PLAN_CHECKS y revisa su plan.
+    Devuelve una lista de (nombre, sentencia, tablas recorridas) con los fallos.
+    """
+    engine, CheckSession = build_check_engine()
+    db = CheckSession()
+    failures = []
+    try:
+        ids = seed_check_data(db)
+        for name, run, allowed in PLAN_CHECKS:
+            with capture_statements(engine) as statements:
+                run(db, ids)
+            for statement, parameters in statements:
+                if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                    continue
+                scanned = [t for t in full_scans(db, statement, parameters) if t not in allowed]
+                if scanned:
+                    failures.append((name, statement, scanned))
+    finally:
+        db.close()
+        engine.dispose()
+    return failures
+
+
+# =============================================================================
+# NUMERO DE SENTENCIAS POR ENDPOINT
+# =============================================================================
+
+STATEMENT_CHECK_ROWS = 40
+STATEMENT_CHECK_PAGE_SIZES = (1, 10, STATEMENT_CHECK_ROWS)
+
+
+def seed_statement_check_data(db):
+    """Crea varios negocios y clientes para que las cargas perezosas no se oculten en la sesion"""
+    owner = models.User(email="owner@check.local", hashed_password="x", role="business")
+    db.add(owner)
+    db.flush()
+
+    clients = [
+        models.User(email=f"client{i}@check.local", hashed_password="x", role="user", full_name=f"Cliente {i}")
+        for i in range(STATEMENT_CHECK_ROWS)
+    ]
+    db.add_all(clients)
+    db.flush()
+
+    # Un negocio aprobado del mismo dueno y uno pendiente de un dueno distinto, intercalados
+    businesses = []
+    pending = []
+    for i in range(STATEMENT_CHECK_ROWS):
+        businesses.append(models.Business(name=f"Negocio {i}", address="Getsemani", category="bar", status="approved", owner_id=owner.id))
+        pending.append(models.Business(name=f"Pendiente {i}", address="Getsemani", category="bar", status="pending", owner_id=clients[i].id))
+        db.add_all([businesses[-1], pending[-1]])
+    db.flush()
+
+    for business in businesses + pending:
+        db.add(models.BusinessImage(business_id=business.id, filename="check.jpg", url="/uploads/businesses/check.jpg"))
+
+    # Cliente 0 consume en todos los negocios; todos los clientes consumen en el negocio 0
+    for i in range(STATEMENT_CHECK_ROWS):
+        db.add(models.Consumption(user_id=clients[0].id, business_id=businesses[i].id, amount=10000, points_earned=1, registered_by_id=owner.id))
+        db.add(models.Consumption(user_id=clients[i].id, business_id=businesses[0].id, amount=10000, points_earned=1, registered_by_id=owner.id))
+    db.commit()
+
+    return {"owner": owner.id, "client": clients[0].id, "business": businesses[0].id}
+
+
+def _serialize(schema, items):
+    """Serializa la respuesta como lo hace el endpoint"""
+    return fastjson.dump_list(schema, items)
+
+
+# (endpoint, funcion que arma la respuesta para un tamano de pagina)
+STATEMENT_CHECKS = [
+    (
+        "GET /my-points/history",
+        lambda db, ids, size: _serialize(
+            schemas.ConsumptionWithDetails,
+            crud.get_user_consumption_history(db, ids["client"], limit=size)
+        )
+    ),
+    (
+        "GET /my-businesses/{id}/consumptions",
+        lambda db, ids, size: _serialize(
+            schemas.ConsumptionWithUser,
+            crud.get_business_consumption_history(db, ids["business"], limit=size)
+        )
+    ),
+    (
+        # El endpoint no pagina: se serializan los primeros negocios cargados
+        "GET /my-businesses",
+        lambda db, ids, size: _serialize(
+            schemas.Business,
+            crud.get_businesses_by_owner(db, ids["owner"], load=crud.LOAD_IMAGES)[:size]
+        )
+    ),
+    (
+        "GET /admin/businesses",
+        lambda db, ids, size: _serialize(
+            schemas.BusinessWithOwner,
+            crud.get_businesses(db, limit=size, load=crud.LOAD_IMAGES_AND_OWNER)
+        )
+    ),
+    (
+        "GET /admin/businesses/pending",
+        lambda db, ids, size: _serialize(
+            schemas.BusinessWithOwner,
+            crud.get_businesses(db, status="pending", limit=size, load=crud.LOAD_IMAGES_AND_OWNER)
+        )
+    ),
+]
+
+
+def check_statement_counts():
+    """
+    Ejecuta cada endpoint de STATEMENT_CHECKS con distintos tamanos de pagina.
+    Devuelve {endpoint: {tamano: sentencias}} y la lista de endpoints cuyo
+    numero de sentencias depende del tamano de la pagina.
+    """
+    engine, CheckSession = build_check_engine()
+    counts = {}
+    failures = []
+    try:
+        db = CheckSession()
+        ids = seed_statement_check_data(db)
+        db.close()
+
+        for name, run in STATEMENT_CHECKS:
+            counts[name] = {}
+            for size in STATEMENT_CHECK_PAGE_SIZES:
+                # Sesion nueva en cada corrida, como en cada request
+                db = CheckSession()
+                with capture_statements(engine) as statements:
+                    run(db, ids, size)
+                db.close()
+                counts[name][size] = len(statements)
+            if len(set(counts[name].values())) > 1:
+                failures.append(name)
+    finally:
+        engine.dispose()
+    return counts, failures
+
+
+# =============================================================================
+# PAGINACION POR CURSOR
+# =============================================================================
+
+PAGE_CHECK_SIZES = (1, 2, 3, 50)
+
+
+def seed_page_check_data(db):
+    """Consumos con fechas repetidas (sin microsegundos y con zona horaria) y clientes empatados en puntos"""
+    owner = models.User(email="owner@check.local", hashed_password="x", role="business")
+    clients = [models.User(email=f"client{i}@check.local", hashed_password="x", role="user") for i in range(4)]
+    db.add_all([owner] + clients)
+    db.flush()
+    business = models.Business(name="Negocio", address="Getsemani", category="bar", status="approved", owner_id=owner.id)
+    db.add(business)
+    db.flush()
+
+    # str() de estas fechas no lleva microsegundos y la de zona horaria agrega "+00:00"
+    moments = [
+        datetime(2026, 1, 1, 12, 0, 0),
+        datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc),
+        datetime(2026, 1, 1, 12, 0, 0, 500),
+        datetime(2026, 1, 2, 8, 30, 0, tzinfo=timezone.utc),
+    ]
+    for i, moment in enumerate(moments * 3):
+        client = clients[i % 2]
+        db.add(models.Consumption(user_id=client.id, business_id=business.id, amount=10000, points_earned=1,
+                                  registered_by_id=owner.id, created_at=moment))
+        crud.apply_points(db, client.id, business.id, 1, 10000)
+    # Los otros dos clientes empatan con los primeros en puntos
+    for client in clients[2:]:
+        crud.apply_points(db, client.id, business.id, 6, 60000, visits=6)
+    db.commit()
+
+    return {"client": clients[0].id, "business": business.id}
+
+
+# (listado, funcion que devuelve una pagina, tipo de cursor, clave de orden)
+PAGE_CHECKS = [
+    ("get_user_consumptions", lambda db, ids, size, after: crud.get_user_consumptions(db, ids["client"], limit=size, after=after),
+     pagination.CREATED_AT_CURSOR, pagination.created_at_key),
+    ("get_business_consumptions", lambda db, ids, size, after: crud.get_business_consumptions(db, ids["business"], limit=size, after=after),
+     pagination.CREATED_AT_CURSOR, pagination.created_at_key),
+    ("get_user_consumption_history", lambda db, ids, size, after: crud.get_user_consumption_history(db, ids["client"], limit=size, after=after),
+     pagination.CREATED_AT_CURSOR, pagination.created_at_key),
+    ("get_business_consumption_history", lambda db, ids, size, after: crud.get_business_consumption_history(db, ids["business"], limit=size, after=after),
+     pagination.CREATED_AT_CURSOR, pagination.created_at_key),
+    ("get_business_customers", lambda db, ids, size, after: crud.get_business_customers(db, ids["business"], limit=size, after=after),
+     pagination.CUSTOMER_CURSOR, pagination.customer_key),
+]
+
+
+def check_cursor_pages():
+    """
+    Recorre cada listado de PAGE_CHECKS pagina por pagina, pasando el cursor
+    por encode_cursor/decode_cursor como lo hace la API, y lo compara con el
+    listado completo. Devuelve {listado: filas} y una lista de (listado,
+    tamano de pagina, filas esperadas, filas recorridas) con los fallos.
+    """
+    engine, CheckSession = build_check_engine()
+    totals = {}
+    failures = []
+    try:
+        db = CheckSession()
+        ids = seed_page_check_data(db)
+        db.close()
+
+        for name, run, cursor_type, key in PAGE_CHECKS:
+            db = CheckSession()
+            try:
+                expected = [key(item) for item in run(db, ids, 1000, None)]
+                totals[name] = len(expected)
+                for size in PAGE_CHECK_SIZES:
+                    walked = []
+                    cursor = None
+                    # Una pagina de mas como limite, por si el cursor no avanza
+                    for _ in range(len(expected) + 2):
+                        page = run(db, ids, size, pagination.decode_cursor(cursor, cursor_type))
+                        walked += [key(item) for item in page]
+                        cursor = pagination.next_cursor(page, size, key)
+                        if not cursor:
+                            break
+                    if walked != expected:
+                        failures.append((name, size, expected, walked))
+            finally:
+                db.close()
+    finally:
+        engine.dispose()
+    return totals, failures
+
@@ -2,8 +2,8 @@
 # Esquemas Pydantic - Getsemani Vivo
 
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Dict
+from datetime import date, datetime
 from enum import Enum
 
 
@@ -37,6 +37,12 @@ class BusinessStatus(str, Enum):
     SUSPENDED = "suspended"
 
 
+class StatsGranularity(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
 # =============================================================================
 # SCHEMAS DE USUARIO
 # =============================================================================
@@ -100,12 +106,21 @@ class BusinessImageCreate(BusinessImageBase):
     pass
 
 
+class ImageVariant(BaseModel):
+    url: str
+    webp_url: str
+    width: int
+    height: int
+
+
 class BusinessImage(BusinessImageBase):
     id: int
     filename: str
     url: str
     business_id: int
     created_at: Optional[datetime] = None
+    # thumb, card y full; None mientras se generan
+    variants: Optional[Dict[str, ImageVariant]] = None
     
     class Config:
         from_attributes = True
@@ -196,6 +211,12 @@ class BusinessSimple(BaseModel):
         from_attributes = True
 
 
+class BusinessNearby(BusinessSimple):
+    latitude: float
+    longitude: float
+    distance_m: float
+
+
 # =============================================================================
 # SCHEMAS DE CONSUMO (PUNTOS)
 # =============================================================================
@@ -245,6 +266,30 @@ class ConsumptionWithUser(BaseModel):
         from_attributes = True
 
 
+class ConsumptionBulkRowResult(BaseModel):
+    row: int
+    user_email: str
+    amount: Optional[float] = None
+    points_earned: Optional[int] = None
+    error: Optional[str] = None
+
+
+class ConsumptionBulkResponse(BaseModel):
+    created: int
+    failed: int
+    total_points: int
+    results: List[ConsumptionBulkRowResult]
+
+
+class BusinessCustomer(BaseModel):
+    user_id: int
+    email: str
+    full_name: Optional[str] = None
+    total_points: int
+    total_spent: float
+    visit_count: int
+
+
 class PointsSummary(BaseModel):
     business_id: int
     business_name: str
@@ -260,6 +305,28 @@ class UserPointsSummary(BaseModel):
     points_by_business: List[PointsSummary]
 
 
+# =============================================================================
+# SCHEMAS DE ESTADISTICAS
+# =============================================================================
+
+class StatsPeriod(BaseModel):
+    start: date
+    consumption_count: int
+    total_amount: float
+    total_points: int
+
+
+class StatsReport(BaseModel):
+    business_id: Optional[int] = None
+    start: date
+    end: date
+    granularity: StatsGranularity
+    consumption_count: int
+    total_amount: float
+    total_points: int
+    periods: List[StatsPeriod]
+
+
 # =============================================================================
 # SCHEMAS DE AUTENTICACION
 # =============================================================================
@@ -278,4 +345,4 @@ class TokenData(BaseModel):
 # =============================================================================
 
 class MessageResponse(BaseModel):
-    message: str
\ No newline at end of file
+    message: str
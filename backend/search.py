@@ -0,0 +1,124 @@
+# search.py
+# Busqueda de texto completo de negocios - Getsemani Vivo
+#
+# En SQLite se usa una tabla virtual FTS5 (businesses_fts) con el nombre, la
+# descripcion y la direccion de cada negocio; su rowid es el id del negocio.
+# crud.py la mantiene al crear, actualizar y eliminar negocios. En otros
+# motores de base de datos la busqueda cae a LIKE sobre la tabla businesses.
+
+import re
+from typing import List
+
+from sqlalchemy import DDL, Boolean, Integer, String, event, text, or_, and_
+from sqlalchemy.orm import Session
+
+import models
+
+FTS_TABLE = "businesses_fts"
+
+# Campos indexados (en este orden) y su peso en el ranking bm25
+SEARCH_FIELDS = ("name", "description", "address")
+SEARCH_WEIGHTS = (10.0, 2.0, 1.0)
+
+# remove_diacritics: "cafe" encuentra "Café"; prefix: acelera las busquedas por prefijo
+create_fts_table = DDL(
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"{', '.join(SEARCH_FIELDS)}, "
+    "tokenize = 'unicode61 remove_diacritics 2', "
+    "prefix = '2 3')"
+)
+
+# Se crea junto con las demas tablas en create_all
+event.listen(models.Base.metadata, "after_create", create_fts_table.execute_if(dialect="sqlite"))
+
+
+def is_fts_available(db: Session) -> bool:
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def parse_terms(query: str) -> List[str]:
+    """Separa la busqueda en palabras, descartando signos y operadores"""
+    return re.findall(r"\w+", query.lower())
+
+
+# =============================================================================
+# MANTENIMIENTO DEL INDICE
+# =============================================================================
+
+def index_business(db: Session, business: models.Business) -> None:
+    """Agrega o reemplaza un negocio en el indice. No hace commit."""
+    if not is_fts_available(db):
+        return
+    remove_business(db, business.id)
+    db.execute(
+        text(f"INSERT INTO {FTS_TABLE} (rowid, name, description, address) VALUES (:id, :name, :description, :address)"),
+        {"id": business.id, "name": business.name, "description": business.description or "", "address": business.address or ""}
+    )
+
+
+def remove_business(db: Session, business_id: int) -> None:
+    """Quita un negocio del indice. No hace commit."""
+    if not is_fts_available(db):
+        return
+    db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": business_id})
+
+
+def rebuild_index(db: Session) -> int:
+    """Reconstruye el indice completo desde la tabla businesses"""
+    if not is_fts_available(db):
+        return 0
+    db.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    db.execute(text(
+        f"INSERT INTO {FTS_TABLE} (rowid, name, description, address) "
+        "SELECT id, name, coalesce(description, ''), coalesce(address, '') FROM businesses"
+    ))
+    db.commit()
+    return db.execute(text(f"SELECT count(*) FROM {FTS_TABLE}")).scalar()
+
+
+# =============================================================================
+# BUSQUEDA
+# =============================================================================
+
+def search_businesses(db: Session, query: str, limit: int = 20):
+    """
+    Negocios aprobados que contienen todas las palabras buscadas (completas o
+    como prefijo: "cevi" encuentra "ceviche"), ordenados por relevancia.
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return []
+
+    if not is_fts_available(db):
+        return _search_with_like(db, terms, limit)
+
+    # Cada palabra entre comillas para que no se interprete como operador FTS5
+    match = " ".join(f'"{term}"*' for term in terms)
+    weights = ", ".join(str(w) for w in SEARCH_WEIGHTS)
+
+    return db.execute(
+        text(
+            "SELECT businesses.id, businesses.name, businesses.category, businesses.address, "
+            "businesses.status, businesses.is_featured "
+            f"FROM {FTS_TABLE} JOIN businesses ON businesses.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH :match AND businesses.status = 'approved' "
+            f"ORDER BY bm25({FTS_TABLE}, {weights}) "
+            "LIMIT :limit"
+        ).columns(
+            # Tipos de las columnas para que is_featured llegue como bool (SQLite lo guarda como 0/1)
+            id=Integer, name=String, category=String, address=String, status=String, is_featured=Boolean
+        ),
+        {"match": match, "limit": limit}
+    ).all()
+
+
+def _search_with_like(db: Session, terms: List[str], limit: int):
+    """Busqueda sin indice para motores sin FTS5"""
+    conditions = [
+        or_(*[getattr(models.Business, field).ilike(f"%{term}%") for field in SEARCH_FIELDS])
+        for term in terms
+    ]
+    return db.query(models.Business).filter(
+        models.Business.status == "approved",
+        and_(*conditions)
+    ).order_by(models.Business.name).limit(limit).all()
@@ -0,0 +1,408 @@
+# seed_data.py
+# Generador de datos sinteticos para pruebas de capacidad - Getsemani Vivo
+#
+# Llena una base vacia con usuarios, negocios (ubicados en Getsemani, el
+# Centro y alrededores de Cartagena, con horarios segun la categoria),
+# imagenes y consumos. Inserta por lotes grandes con executemany de SQLAlchemy
+# Core, sin pasar por el ORM, y crea los indices de consumos e imagenes al
+# final. Las estadisticas diarias se acumulan mientras se generan los
+# consumos; los saldos de puntos y el indice de busqueda se reconstruyen al
+# terminar, igual que con maintenance.py.
+#
+# Es deterministico: la misma semilla y la misma --end-date generan los mismos
+# datos (salvo la sal del hash de la contrasena, que es la misma para todos los
+# usuarios: --password).
+#
+# Uso (desde la carpeta backend; usa DATABASE_URL como el servidor):
+#   python seed_data.py
+#   python seed_data.py --users 1000000 --businesses 20000 --consumptions 10000000
+#   python seed_data.py --seed 7 --end-date 2026-06-30 --days 365
+
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from sqlalchemy import text
+
+from database import SessionLocal, engine
+import models
+import crud
+import geo
+import migrations
+import search
+import stats
+from passwords import pwd_context
+
+
+DEFAULT_PASSWORD = "getsemani-seed"
+EMAIL_DOMAIN = "seed.example.com"
+
+# Barrios de Cartagena: (nombre, latitud, longitud, radio en grados, peso)
+NEIGHBORHOODS = [
+    ("Getsemani", 10.4218, -75.5472, 0.0035, 5),
+    ("Centro Historico", 10.4236, -75.5510, 0.0040, 4),
+    ("San Diego", 10.4279, -75.5468, 0.0025, 2),
+    ("Bocagrande", 10.4005, -75.5550, 0.0060, 2),
+    ("Manga", 10.4120, -75.5370, 0.0050, 1),
+]
+STREETS = {
+    "Getsemani": ["Calle del Arsenal", "Calle de la Media Luna", "Calle del Espiritu Santo", "Calle San Juan",
+                  "Calle de las Palmas", "Calle Larga", "Calle Tripita y Media", "Calle Guerrero"],
+    "Centro Historico": ["Calle de la Moneda", "Calle del Santisimo", "Calle de los Santos de Piedra",
+                         "Calle del Coliseo", "Calle de la Mantilla"],
+    "San Diego": ["Calle del Curato", "Calle de la Tablada", "Calle del Torno", "Calle Cochera del Hobo"],
+    "Bocagrande": ["Avenida San Martin", "Carrera 2", "Carrera 3", "Calle 6"],
+    "Manga": ["Avenida Miramar", "Calle Real de Manga", "Carrera 20"],
+}
+
+# Categoria: (peso, nombres, horario entre semana, horario fin de semana, monto tipico en pesos)
+CATEGORIES = {
+    "bar": (5, ["Bar", "Taberna", "Rooftop", "Salsoteca"], "17:00 - 02:00", "17:00 - 03:00", 60000),
+    "restaurant": (6, ["Restaurante", "Cocina", "Fonda", "Asadero"], "12:00 - 22:00", "12:00 - 23:00", 85000),
+    "cafe": (4, ["Cafe", "Tostaduria", "Panaderia"], "07:00 - 19:00", "08:00 - 20:00", 18000),
+    "hostel": (3, ["Hostal", "Casa", "Posada"], "00:00 - 23:59", "00:00 - 23:59", 120000),
+    "hotel": (2, ["Hotel", "Hotel Boutique"], "00:00 - 23:59", "00:00 - 23:59", 350000),
+    "tour_guide": (1, ["Tours", "Recorridos"], "08:00 - 17:00", "08:00 - 14:00", 90000),
+    "shop": (3, ["Tienda", "Artesanias", "Boutique"], "09:00 - 20:00", "10:00 - 21:00", 45000),
+    "art_gallery": (1, ["Galeria", "Taller"], "10:00 - 19:00", "10:00 - 20:00", 150000),
+    "rental": (1, ["Alquiler de Bicis", "Alquiler"], "08:00 - 18:00", "08:00 - 18:00", 70000),
+}
+NAME_WORDS = ["La Trinidad", "El Mural", "Media Luna", "La Plaza", "El Arsenal", "Palenque", "La Bahia",
+              "Del Puerto", "San Juan", "Las Palmas", "La Muralla", "El Caribe", "Champeta", "Bocachica"]
+FIRST_NAMES = ["Camilo", "Valentina", "Andres", "Mariana", "Santiago", "Daniela", "Sebastian", "Laura",
+               "Juan", "Sofia", "Carlos", "Isabella", "Mateo", "Gabriela", "Luis", "Paula", "John", "Emma"]
+LAST_NAMES = ["Gomez", "Rodriguez", "Martinez", "Herrera", "Castro", "Pineda", "Barrios", "Julio",
+              "Marrugo", "Cassiani", "Smith", "Muller", "Rossi", "Dupont"]
+
+# Peso de cada hora local en los consumos: casi nada de madrugada, picos al almuerzo y en la noche
+HOUR_WEIGHTS = [2, 1, 1, 0, 0, 0, 1, 2, 3, 3, 3, 4, 7, 7, 5, 3, 3, 4, 6, 8, 9, 9, 7, 4]
+IMAGE_VARIANTS = (("thumb", 200), ("card", 640), ("full", 1600))
+
+
+def owner_email(user_id: int) -> str:
+    return f"owner{user_id}@{EMAIL_DOMAIN}"
+
+
+def client_email(user_id: int) -> str:
+    return f"user{user_id}@{EMAIL_DOMAIN}"
+
+
+def owner_count(businesses: int) -> int:
+    """Un dueno cada 5 negocios; los usuarios 1..owner_count son los duenos"""
+    return max(businesses // 5, 1)
+
+
+# =============================================================================
+# GENERADORES
+# =============================================================================
+
+def local_midnight(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=stats.LOCAL_TIMEZONE)
+
+
+def generate_users(
+    rng: random.Random, owners: int, clients: int, hashed_password: str, created_before: datetime
+) -> Iterable[dict]:
+    for user_id in range(1, owners + clients + 1):
+        is_owner = user_id <= owners
+        yield {
+            "id": user_id,
+            "email": owner_email(user_id) if is_owner else client_email(user_id),
+            "hashed_password": hashed_password,
+            "role": "business" if is_owner else "user",
+            "full_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "phone": f"+57 3{rng.randint(0, 2)}{rng.randint(0, 9)} {rng.randint(100, 999)} {rng.randint(1000, 9999)}",
+            "is_active": True,
+            "created_at": created_before - timedelta(seconds=rng.randrange(365 * 86400)),
+        }
+
+
+def generate_businesses(rng: random.Random, businesses: int, owners: int, created_before: datetime) -> Iterable[dict]:
+    categories = list(CATEGORIES)
+    category_weights = [CATEGORIES[c][0] for c in categories]
+    neighborhood_weights = [n[4] for n in NEIGHBORHOODS]
+
+    for business_id in range(1, businesses + 1):
+        category = rng.choices(categories, category_weights)[0]
+        _, prefixes, weekday, weekend, _ = CATEGORIES[category]
+        neighborhood, lat, lng, radius, _ = rng.choices(NEIGHBORHOODS, neighborhood_weights)[0]
+        latitude = round(lat + rng.uniform(-radius, radius), 6)
+        longitude = round(lng + rng.uniform(-radius, radius), 6)
+        # Casi todos aprobados; algunos pendientes o rechazados para las vistas de admin
+        status = rng.choices(("approved", "pending", "rejected", "suspended"), (90, 6, 3, 1))[0]
+        closed_monday = rng.random() < 0.3
+        yield {
+            "id": business_id,
+            "name": f"{rng.choice(prefixes)} {rng.choice(NAME_WORDS)} {business_id}",
+            "description": f"{rng.choice(prefixes)} en {neighborhood}, Cartagena",
+            "category": category,
+            "phone": f"+57 605 {rng.randint(600, 699)} {rng.randint(1000, 9999)}",
+            "instagram": f"@negocio{business_id}",
+            "address": f"{rng.choice(STREETS[neighborhood])} #{rng.randint(1, 60)}-{rng.randint(1, 99)}, {neighborhood}",
+            "latitude": latitude,
+            "longitude": longitude,
+            "geohash": geo.geohash_for(latitude, longitude),
+            "schedule_monday": None if closed_monday else weekday,
+            "schedule_tuesday": weekday,
+            "schedule_wednesday": weekday,
+            "schedule_thursday": weekday,
+            "schedule_friday": weekend,
+            "schedule_saturday": weekend,
+            "schedule_sunday": weekend if rng.random() < 0.7 else None,
+            "status": status,
+            "is_featured": status == "approved" and rng.random() < 0.05,
+            "points_per_10000": rng.choices((1, 2, 3), (70, 25, 5))[0],
+            "owner_id": (business_id - 1) % owners + 1,
+            "created_at": created_before - timedelta(seconds=rng.randrange(365 * 86400)),
+        }
+
+
+def generate_images(rng: random.Random, businesses: int, images_per_business: int) -> Iterable[dict]:
+    for business_id in range(1, businesses + 1):
+        # Entre 1 y el doble del promedio; algunos negocios sin imagenes
+        count = rng.randint(0, images_per_business * 2) if images_per_business else 0
+        for order in range(count):
+            name = f"seed_{business_id}_{order}"
+            yield {
+                "business_id": business_id,
+                "filename": f"{name}.jpg",
+                "url": f"/uploads/businesses/{name}.jpg",
+                "order": order,
+                "is_primary": order == 0,
+                "variants": {
+                    variant: {
+                        "url": f"/uploads/businesses/{name}_{variant}.jpg",
+                        "webp_url": f"/uploads/businesses/{name}_{variant}.webp",
+                        "width": size,
+                        "height": size * 3 // 4,
+                    }
+                    for variant, size in IMAGE_VARIANTS
+                },
+            }
+
+
+def generate_consumptions(
+    rng: random.Random,
+    business_rows: List[dict],
+    owners: int,
+    clients: int,
+    count: int,
+    end_date: date,
+    days: int,
+    daily_stats: Dict[Tuple[int, date], list]
+) -> Iterable[dict]:
+    """
+    Consumos en negocios aprobados, repartidos en los ultimos days dias hasta
+    end_date (hora local). Va sumando cada consumo a daily_stats.
+    """
+    approved = [b for b in business_rows if b["status"] == "approved"] or business_rows
+    # Popularidad desigual: tabla de sorteo donde los negocios populares aparecen mas veces
+    draw = []
+    for business in approved:
+        draw.extend([business] * rng.choice((1, 1, 1, 2, 3, 5, 8)))
+    hours = [hour for hour, weight in enumerate(HOUR_WEIGHTS) for _ in range(weight)]
+    first_day = end_date - timedelta(days=days - 1)
+    first_midnight = local_midnight(first_day)
+    first_user = owners + 1
+
+    for _ in range(count):
+        business = draw[rng.randrange(len(draw))]
+        typical = CATEGORIES[business["category"]][4]
+        amount = float(max(round(typical * rng.lognormvariate(0, 0.5), -3), 1000))
+        points = int(amount / 10000) * business["points_per_10000"]
+        offset = rng.randrange(days)
+        created_local = first_midnight + timedelta(
+            days=offset, hours=hours[rng.randrange(len(hours))], seconds=rng.randrange(3600)
+        )
+        # Clientes frecuentes: los primeros ids aparecen mas que los ultimos
+        user_id = first_user + int(clients * rng.random() ** 2)
+
+        day_totals = daily_stats.get((business["id"], first_day + timedelta(days=offset)))
+        if day_totals is None:
+            day_totals = daily_stats[(business["id"], first_day + timedelta(days=offset))] = [0, 0.0, 0]
+        day_totals[0] += 1
+        day_totals[1] += amount
+        day_totals[2] += points
+
+        yield {
+            "user_id": user_id,
+            "business_id": business["id"],
+            "amount": amount,
+            "points_earned": points,
+            "description": None,
+            "registered_by_id": business["owner_id"],
+            "created_at": created_local.astimezone(timezone.utc),
+        }
+
+
+# =============================================================================
+# CARGA
+# =============================================================================
+
+def insert_batches(conn, table, rows: Iterable[dict], batch_size: int, label: str, log: Callable) -> int:
+    """INSERT con executemany por lotes, con un commit por lote"""
+    started = time.perf_counter()
+    inserted = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            conn.execute(table.insert(), batch)
+            conn.commit()
+            inserted += len(batch)
+            batch = []
+            log(f"   {label}: {inserted:,} ({inserted / (time.perf_counter() - started):,.0f}/s)")
+    if batch:
+        conn.execute(table.insert(), batch)
+        conn.commit()
+        inserted += len(batch)
+    log(f"✅ {label}: {inserted:,} en {time.perf_counter() - started:.1f}s")
+    return inserted
+
+
+def seed(
+    target_engine,
+    clients: int,
+    businesses: int,
+    images_per_business: int,
+    consumptions: int,
+    days: int = 90,
+    end_date: date = None,
+    seed_value: int = 42,
+    batch_size: int = 50000,
+    password: str = DEFAULT_PASSWORD,
+    log: Callable = print
+) -> dict:
+    """Siembra una base vacia (ya migrada) y devuelve los conteos"""
+    started = time.perf_counter()
+    rng = random.Random(seed_value)
+    end_date = end_date or stats.local_day()
+    owners = owner_count(businesses)
+    # Usuarios y negocios se registraron antes del primer consumo
+    created_before = local_midnight(end_date - timedelta(days=days - 1)).astimezone(timezone.utc)
+    # Un solo hash para todos: bcrypt tarda cientos de milisegundos por usuario
+    hashed_password = pwd_context.hash(password)
+
+    # Los indices de las tablas grandes se crean al final: es mas rapido que mantenerlos fila por fila
+    deferred_indexes = list(models.Consumption.__table__.indexes) + list(models.BusinessImage.__table__.indexes)
+    for index in deferred_indexes:
+        index.drop(bind=target_engine, checkfirst=True)
+
+    try:
+        with target_engine.connect() as conn:
+            if target_engine.dialect.name == "sqlite":
+                # Solo para esta conexion: si la carga se interrumpe se vuelve a sembrar
+                conn.exec_driver_sql("PRAGMA synchronous=OFF")
+
+            insert_batches(conn, models.User.__table__, generate_users(rng, owners, clients, hashed_password, created_before),
+                           batch_size, "Usuarios", log)
+            business_rows = list(generate_businesses(rng, businesses, owners, created_before))
+            insert_batches(conn, models.Business.__table__, business_rows, batch_size, "Negocios", log)
+            images = insert_batches(conn, models.BusinessImage.__table__,
+                                    generate_images(rng, businesses, images_per_business), batch_size, "Imagenes", log)
+
+            daily_stats = {}
+            insert_batches(
+                conn, models.Consumption.__table__,
+                generate_consumptions(rng, business_rows, owners, clients, consumptions, end_date, days, daily_stats),
+                batch_size, "Consumos", log
+            )
+            insert_batches(conn, models.BusinessDailyStats.__table__, (
+                {"business_id": business_id, "day": day, "consumption_count": count,
+                 "total_amount": total_amount, "total_points": total_points}
+                for (business_id, day), (count, total_amount, total_points) in daily_stats.items()
+            ), batch_size, "Estadisticas diarias", log)
+
+            # Con ids explicitos, PostgreSQL no avanza las secuencias
+            if target_engine.dialect.name == "postgresql":
+                for table in ("users", "businesses"):
+                    conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"))
+                conn.commit()
+    finally:
+        # Tambien si la carga falla: la base no queda sin los indices de consultas
+        index_started = time.perf_counter()
+        try:
+            for index in deferred_indexes:
+                index.create(bind=target_engine, checkfirst=True)
+        except Exception:
+            log("⚠️  No se pudieron recrear los indices de consumos e imagenes. "
+                "Ejecuta: python maintenance.py schema indexes")
+            raise
+        log(f"✅ Indices de consumos e imagenes en {time.perf_counter() - index_started:.1f}s")
+
+    derived_started = time.perf_counter()
+    db = SessionLocal(bind=target_engine)
+    try:
+        crud.rebuild_points_balances(db)
+        search.rebuild_index(db)
+    finally:
+        db.close()
+    log(f"✅ Saldos de puntos e indice de busqueda en {time.perf_counter() - derived_started:.1f}s")
+
+    return {
+        "owners": owners,
+        "clients": clients,
+        "businesses": businesses,
+        "images": images,
+        "consumptions": consumptions,
+        "end_date": end_date.isoformat(),
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+# =============================================================================
+# LINEA DE COMANDOS
+# =============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera datos sinteticos para pruebas de capacidad")
+    parser.add_argument("--users", type=int, default=100000, help="Clientes (los duenos se suman aparte)")
+    parser.add_argument("--businesses", type=int, default=2000, help="Negocios (un dueno cada 5)")
+    parser.add_argument("--images-per-business", type=int, default=3, help="Promedio de imagenes por negocio")
+    parser.add_argument("--consumptions", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=90, help="Dias de historia de los consumos")
+    parser.add_argument("--end-date", type=date.fromisoformat, help="Ultimo dia con consumos (por defecto, hoy)")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla del generador")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Filas por INSERT")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help="Contrasena de todos los usuarios")
+    parser.add_argument("--quiet", action="store_true", help="Solo muestra el resumen")
+    args = parser.parse_args(argv)
+
+    migrations.migrate(engine)
+    db = SessionLocal()
+    try:
+        if db.query(models.User.id).first() is not None:
+            print("⚠️  La base ya tiene usuarios: el generador solo llena bases vacias")
+            return 1
+    finally:
+        db.close()
+
+    def log(message: str):
+        if not args.quiet or message.startswith("✅"):
+            print(message)
+
+    summary = seed(
+        engine,
+        clients=args.users,
+        businesses=args.businesses,
+        images_per_business=args.images_per_business,
+        consumptions=args.consumptions,
+        days=args.days,
+        end_date=args.end_date,
+        seed_value=args.seed,
+        batch_size=args.batch_size,
+        password=args.password,
+        log=log
+    )
+    print(f"✅ Base sembrada en {summary['seconds']}s: {summary['owners'] + summary['clients']:,} usuarios, "
+          f"{summary['businesses']:,} negocios, {summary['images']:,} imagenes, {summary['consumptions']:,} consumos")
+    print(f"   Contrasena de todos los usuarios: {args.password}")
+    print(f"   Duenos: {owner_email(1)} ... {owner_email(summary['owners'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+# stats.py
+# Estadisticas de consumos por dia, semana o mes - Getsemani Vivo
+#
+# Cada consumo suma su monto y sus puntos a la fila (negocio, dia) de
+# business_daily_stats en la misma transaccion (crud.apply_daily_stats). Los
+# reportes leen solo esas filas: un mes de un negocio son 30 filas, sin
+# importar cuantos consumos tuvo.
+#
+# Los dias son de la hora local de Cartagena (UTC-5, sin horario de verano),
+# para que las ventas de la noche cuenten en el dia en que ocurrieron.
+#
+# Las bases con consumos anteriores a esta tabla se llenan con:
+#   python maintenance.py stats rebuild
+#
+# Variables de entorno:
+#   STATS_UTC_OFFSET_HOURS   desfase de la hora local (por defecto -5)
+
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Optional, Tuple
+
+from fastapi import HTTPException
+
+import schemas
+
+LOCAL_TIMEZONE = timezone(timedelta(hours=float(os.getenv("STATS_UTC_OFFSET_HOURS", "-5"))))
+
+DEFAULT_RANGE_DAYS = 30
+MAX_RANGE_DAYS = 731
+
+
+def local_day(moment: Optional[datetime] = None) -> date:
+    """Dia local de un instante (por defecto, ahora). Las fechas sin zona se toman como UTC."""
+    if moment is None:
+        moment = datetime.now(timezone.utc)
+    elif moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(LOCAL_TIMEZONE).date()
+
+
+def resolve_range(start: Optional[date], end: Optional[date]) -> Tuple[date, date]:
+    """
+    Rango de dias de un reporte (ambos incluidos). Sin fechas, los ultimos 30
+    dias. Lanza 400 si el rango esta invertido o es demasiado largo.
+    """
+    end = end or local_day()
+    start = start or end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="La fecha inicial es posterior a la final")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"El rango no puede superar {MAX_RANGE_DAYS} dias")
+    return start, end
+
+
+def period_start(day: date, granularity: schemas.StatsGranularity) -> date:
+    """Primer dia del periodo que contiene a day (las semanas empiezan el lunes)"""
+    if granularity == schemas.StatsGranularity.WEEK:
+        return day - timedelta(days=day.weekday())
+    if granularity == schemas.StatsGranularity.MONTH:
+        return day.replace(day=1)
+    return day
+
+
+def next_period(start: date, granularity: schemas.StatsGranularity) -> date:
+    """Primer dia del periodo siguiente al que empieza en start"""
+    if granularity == schemas.StatsGranularity.WEEK:
+        return start + timedelta(days=7)
+    if granularity == schemas.StatsGranularity.MONTH:
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def build_report(
+    rows: Iterable,
+    start: date,
+    end: date,
+    granularity: schemas.StatsGranularity,
+    business_id: Optional[int] = None
+) -> dict:
+    """
+    Agrupa las filas diarias (day, consumption_count, total_amount, total_points)
+    por periodo. Incluye los periodos sin consumos, con totales en cero.
+    """
+    periods = {}
+    day = period_start(start, granularity)
+    while day <= end:
+        periods[day] = {"start": day, "consumption_count": 0, "total_amount": 0.0, "total_points": 0}
+        day = next_period(day, granularity)
+
+    for row in rows:
+        period = periods[period_start(row.day, granularity)]
+        period["consumption_count"] += row.consumption_count
+        period["total_amount"] += row.total_amount
+        period["total_points"] += row.total_points
+
+    periods = list(periods.values())
+    return {
+        "business_id": business_id,
+        "start": start,
+        "end": end,
+        "granularity": granularity,
+        "consumption_count": sum(p["consumption_count"] for p in periods),
+        "total_amount": sum(p["total_amount"] for p in periods),
+        "total_points": sum(p["total_points"] for p in periods),
+        "periods": periods
+    }
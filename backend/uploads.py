@@ -0,0 +1,242 @@
+# uploads.py
+# Recepcion y almacenamiento de imagenes subidas - Getsemani Vivo
+#
+# Las imagenes se copian por bloques a un archivo temporal en la carpeta de
+# destino y se renombran al terminar, de modo que ninguna subida se carga
+# completa en memoria. La copia se corta en cuanto se supera el limite de
+# tamano y el tipo se detecta por los primeros bytes del archivo, no por el
+# content_type ni la extension que envia el cliente.
+#
+# Cada archivo se guarda con el hash SHA-256 de su contenido como nombre: la
+# misma foto subida varias veces (o por varios negocios) se guarda una sola
+# vez. Varias filas de business_images pueden apuntar al mismo archivo, asi
+# que borrar una imagen no toca el disco: entre contar referencias y borrar,
+# otra subida del mismo contenido podria haber reemplazado el archivo.
+# "maintenance.py images gc" (remove_unreferenced_files) borra despues los
+# archivos y variantes que ninguna imagen usa y que son mas viejos que un
+# margen, que cubre las subidas en curso.
+# Como el contenido de un nombre nunca cambia, se sirven con cache inmutable.
+#
+# UploadSizeLimitMiddleware rechaza con 413 las subidas cuyo Content-Length ya
+# supera el limite, antes de que el servidor lea el cuerpo del request, y
+# cuenta los bytes que llegan para cortar tambien las subidas sin
+# Content-Length (chunked). save_image conserva su propio limite por archivo.
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from typing import BinaryIO, Iterable, List, Optional
+
+from fastapi import HTTPException
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse
+
+UPLOAD_DIR = "uploads"
+BUSINESS_UPLOAD_DIR = os.path.join(UPLOAD_DIR, "businesses")
+
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+# Margen para los encabezados multipart que acompanan al archivo
+MULTIPART_OVERHEAD = 16 * 1024
+
+TOO_LARGE_DETAIL = "La imagen no puede superar 5MB"
+INVALID_TYPE_DETAIL = "Tipo de archivo no permitido. Use JPG, PNG o WEBP"
+
+
+def public_url(filename: str) -> str:
+    """URL publica de un archivo guardado en BUSINESS_UPLOAD_DIR"""
+    return f"/uploads/businesses/{filename}"
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Extension segun la firma del archivo (jpg, png, webp) o None"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def save_image(source: BinaryIO, directory: str = BUSINESS_UPLOAD_DIR) -> str:
+    """
+    Copia la imagen de source a directory por bloques y devuelve el nombre del
+    archivo guardado (hash del contenido + extension). Lanza 400 si no es JPG/PNG/WEBP y 413 si supera el limite.
+    Es bloqueante: llamarla desde un endpoint sincrono (threadpool).
+    """
+    head = source.read(CHUNK_SIZE)
+    extension = sniff_image_type(head)
+    if extension is None:
+        raise HTTPException(status_code=400, detail=INVALID_TYPE_DETAIL)
+
+    size = 0
+    digest = hashlib.sha256()
+    temp = tempfile.NamedTemporaryFile(dir=directory, prefix=".upload-", delete=False)
+    try:
+        with temp:
+            chunk = head
+            while chunk:
+                size += len(chunk)
+                if size > MAX_IMAGE_BYTES:
+                    raise HTTPException(status_code=413, detail=TOO_LARGE_DETAIL)
+                digest.update(chunk)
+                temp.write(chunk)
+                chunk = source.read(CHUNK_SIZE)
+
+        # Si el archivo ya existe tiene el mismo contenido: reemplazarlo es
+        # equivalente y evita depender de un archivo que otro request borra
+        filename = f"{digest.hexdigest()}.{extension}"
+        os.replace(temp.name, os.path.join(directory, filename))
+        return filename
+    except BaseException:
+        os.unlink(temp.name)
+        raise
+
+
+def remove_unreferenced_files(
+    referenced: Iterable[str],
+    grace_seconds: float,
+    directory: str = BUSINESS_UPLOAD_DIR,
+    dry_run: bool = False
+) -> List[str]:
+    """
+    Borra los archivos de directory que no son ninguno de referenced ni una
+    variante suya ("<nombre>_<variante>.<ext>"), y los temporales que quedaron
+    de subidas interrumpidas. Un original y sus variantes se conservan juntos
+    si alguno se modifico hace menos de grace_seconds: save_image deja el
+    archivo antes de que exista su fila, y la misma foto puede volver a
+    subirse mientras se recolecta.
+    Devuelve los nombres borrados (o que se borrarian con dry_run).
+    """
+    stems = {filename.rsplit(".", 1)[0] for filename in referenced}
+    cutoff = time.time() - grace_seconds
+
+    groups = {}
+    for entry in os.scandir(directory):
+        if entry.is_file():
+            stem = entry.name.rsplit(".", 1)[0]
+            groups.setdefault(stem.split("_", 1)[0], []).append((entry, stem))
+
+    removed = []
+    for root, entries in groups.items():
+        if any(stem in stems or root in stems for _, stem in entries):
+            continue
+        if any(entry.stat().st_mtime > cutoff for entry, _ in entries):
+            continue
+        for entry, _ in entries:
+            if not dry_run:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+            removed.append(entry.name)
+    return sorted(removed)
+
+
+# =============================================================================
+# ENTREGA CON CACHE INMUTABLE
+# =============================================================================
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Nombres que empiezan con el hash del contenido (originales y sus variantes)
+CONTENT_ADDRESSED_NAME = re.compile(r"^[0-9a-f]{64}[._]")
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    StaticFiles con Cache-Control inmutable. Los archivos nombrados por su
+    hash usan el nombre como ETag. FileResponse ya atiende Range e If-None-Match.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        name = os.path.basename(full_path)
+        if CONTENT_ADDRESSED_NAME.match(name):
+            response.headers["ETag"] = f'"{name}"'
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+# =============================================================================
+# LIMITE DE TAMANO ANTES DE LEER EL CUERPO
+# =============================================================================
+
+# Endpoints que reciben imagenes
+IMAGE_UPLOAD_PATH = re.compile(r"^/my-businesses/\d+/images$")
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Responde 413 si una subida de imagen supera el limite: de inmediato si lo
+    anuncia el Content-Length y, si no lo trae (chunked) o miente, en cuanto
+    los bytes recibidos lo superan.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_IMAGE_BYTES + MULTIPART_OVERHEAD):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if not (
+            scope["type"] == "http"
+            and scope["method"] == "POST"
+            and IMAGE_UPLOAD_PATH.match(scope["path"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        if self._content_length(scope) > self.max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # FastAPI deja pasar las HTTPException que surgen al leer el
+                    # cuerpo: la aplicacion responde el 413 con sus cabeceras (CORS)
+                    raise HTTPException(status_code=413, detail=TOO_LARGE_DETAIL, headers={"Connection": "close"})
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    @staticmethod
+    async def _reject(send):
+        body = json.dumps({"detail": TOO_LARGE_DETAIL}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    def _content_length(scope) -> int:
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    return int(value)
+                except ValueError:
+                    return 0
+        return 0